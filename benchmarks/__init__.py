@@ -0,0 +1,7 @@
+# Benchmark suite for Mu.
+#
+#    python -m benchmarks                      # run all benchmarks
+#    python -m benchmarks -k xml --json a.json # run a subset, save results
+#    python -m benchmarks compare a.json b.json
+#
+from __future__ import annotations
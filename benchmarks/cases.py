@@ -0,0 +1,310 @@
+# Benchmark cases.
+#
+# A case is a function that prepares its input and returns a `Bench` with the
+# callable to time. Register it with the `case` decorator.
+#
+from __future__ import annotations
+
+import itertools
+
+import mu
+from mu import util
+
+from benchmarks import corpora
+
+CASES = {}
+
+
+class Bench:
+    """A callable to time along with the size of its input.
+
+    Args:
+        fn: The callable to time, it's called without arguments
+        nodes: Number of Mu nodes processed by one call
+        size: Number of bytes processed by one call, by default the size
+            of the string (or bytes) returned by `fn`
+
+    """
+
+    def __init__(self, fn, nodes: int, size: int | None = None) -> None:
+        self.fn = fn
+        self.nodes = nodes
+        self.size = size
+
+
+def case(name: str):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+
+    return register
+
+
+@case("xml/wide")
+def xml_wide():
+    doc = corpora.wide_doc()
+    return Bench(lambda: mu.xml(doc), corpora.count_nodes(doc))
+
+
+@case("html/wide")
+def html_wide():
+    doc = corpora.wide_doc()
+    return Bench(lambda: mu.html(doc), corpora.count_nodes(doc))
+
+
+@case("html/wide-bytes")
+def html_wide_bytes():
+    doc = corpora.wide_doc()
+    return Bench(lambda: mu.html(doc, encoding="utf-8"), corpora.count_nodes(doc))
+
+
+@case("xml/wide-parallel")
+def xml_wide_parallel():
+    doc = corpora.wide_doc()
+    return Bench(lambda: mu.xml(doc, workers=4), corpora.count_nodes(doc))
+
+
+@case("xml/wide-fused")
+def xml_wide_fused():
+    doc = corpora.wide_doc()
+    serializer = mu.XmlSerializer(fused=True)
+    return Bench(lambda: serializer.write(doc), corpora.count_nodes(doc))
+
+
+@case("xml/wide-indent")
+def xml_wide_indent():
+    doc = corpora.wide_doc()
+    return Bench(lambda: mu.xml(doc, indent=2), corpora.count_nodes(doc))
+
+
+@case("renderer/wide-edit")
+def renderer_wide_edit():
+    def edit():
+        item[2][1] = f"Item {next(counter)}"
+        return renderer.render(doc)
+
+    doc = corpora.wide_doc()
+    item = doc[2][1][1000]
+    counter = itertools.count()
+    renderer = mu.Renderer()
+    renderer.render(doc)
+    return Bench(edit, corpora.count_nodes(doc))
+
+
+@case("expand/wide")
+def expand_wide():
+    doc = corpora.wide_doc()
+    return Bench(lambda: mu.expand(doc), corpora.count_nodes(doc))
+
+
+@case("xml/deep")
+def xml_deep():
+    doc = corpora.deep_doc()
+    return Bench(lambda: mu.xml(doc), corpora.count_nodes(doc))
+
+
+@case("xml/deep-indent")
+def xml_deep_indent():
+    doc = corpora.deep_doc()
+    return Bench(lambda: mu.xml(doc, indent=2), corpora.count_nodes(doc))
+
+
+@case("expand/deep")
+def expand_deep():
+    doc = corpora.deep_doc()
+    return Bench(lambda: mu.expand(doc), corpora.count_nodes(doc))
+
+
+@case("xml/svg")
+def xml_svg():
+    doc = corpora.svg_doc()
+    return Bench(lambda: mu.xml(doc), corpora.count_nodes(doc))
+
+
+@case("html/sugar")
+def html_sugar():
+    doc = corpora.sugar_doc()
+    return Bench(lambda: mu.html(doc), corpora.count_nodes(doc))
+
+
+@case("html/plain")
+def html_plain():
+    doc = corpora.plain_doc()
+    return Bench(lambda: mu.html(doc), corpora.count_nodes(doc))
+
+
+@case("html/fragments-loop")
+def html_fragments_loop():
+    docs = corpora.fragments()
+    return Bench(lambda: [mu.html(doc) for doc in docs], corpora.count_nodes(docs))
+
+
+@case("html/fragments-many")
+def html_fragments_many():
+    docs = corpora.fragments()
+    return Bench(lambda: mu.render_many(docs), corpora.count_nodes(docs))
+
+
+@case("node/create")
+def node_create():
+    def create():
+        return [mu.Element("li", i, cls="item") for i in range(n)]
+
+    n = 100_000
+    return Bench(create, n, size=0)
+
+
+@case("node/call")
+def node_call():
+    nodes = [mu.Element("li", i, cls="item") for i in range(100_000)]
+    return Bench(lambda: [node() for node in nodes], len(nodes), size=0)
+
+
+@mu.pure
+class Menu(mu.Node):
+    def __init__(self, active):
+        super().__init__("nav.menu", active=active)
+
+    def __call__(self, *nodes, **attrs):
+        active = self.attrs["active"]
+        return [
+            "nav.menu",
+            [
+                "ul",
+                [
+                    [
+                        "li",
+                        {"class": "active" if i == active else None},
+                        ["a", {"href": f"/p/{i}"}, f"Page {i}"],
+                    ]
+                    for i in range(10)
+                ],
+            ],
+        ]
+
+
+class ImpureMenu(Menu):
+    pure = False
+
+
+def _menu_docs(menu):
+    return [["div", menu(i % 3), ["p", f"Item {i}"]] for i in range(1000)]
+
+
+@case("html/components")
+def html_components():
+    docs = _menu_docs(ImpureMenu)
+    return Bench(lambda: mu.render_many(docs), corpora.count_nodes(docs))
+
+
+@case("html/components-pure")
+def html_components_pure():
+    docs = _menu_docs(Menu)
+    return Bench(lambda: mu.render_many(docs), corpora.count_nodes(docs))
+
+
+@case("sugar/transform")
+def sugar_transform():
+    doc = corpora.sugar_doc()
+    elements = []
+    stack = [doc]
+    while stack:
+        node = stack.pop()
+        if mu.is_element(node):
+            elements.append(node)
+            stack.extend(mu.content(node))
+        elif isinstance(node, list):
+            stack.extend(node)
+    transform = mu.name_xf.transform
+
+    def run():
+        for element in elements:
+            transform(element)
+
+    return Bench(run, len(elements))
+
+
+def _escape_bench(escape):
+    values = corpora.escape_values()
+    size = sum(len(str(value)) for value in values)
+    return Bench(lambda: [escape(value) for value in values], len(values), size)
+
+
+@case("escape/escape_html")
+def escape_html():
+    return _escape_bench(util.escape_html)
+
+
+@case("escape/text")
+def escape_text():
+    return _escape_bench(util.escape_text)
+
+
+@case("escape/attr")
+def escape_attr():
+    return _escape_bench(util.escape_attr)
+
+
+@case("dumps/payload")
+def dumps_payload():
+    data = corpora.payload()
+    nodes = corpora.count_nodes(mu.dumps(data))
+    return Bench(lambda: mu.dumps(data), nodes)
+
+
+@case("loads/payload")
+def loads_payload():
+    doc = mu.dumps(corpora.payload())
+    return Bench(lambda: mu.loads(doc), corpora.count_nodes(doc))
+
+
+@case("xml/dumps")
+def xml_dumps():
+    data = corpora.payload()
+    nodes = corpora.count_nodes(mu.dumps(data))
+    return Bench(lambda: mu.xml(mu.dumps(data)), nodes)
+
+
+@case("xml/iterdumps")
+def xml_iterdumps():
+    data = corpora.payload()
+    nodes = corpora.count_nodes(mu.dumps(data))
+    return Bench(lambda: "".join(mu.iterdumps(data, method="xml")), nodes)
+
+
+@case("xml/dumps_xml")
+def xml_dumps_xml():
+    data = corpora.payload()
+    nodes = corpora.count_nodes(mu.dumps(data))
+    return Bench(lambda: mu.dumps_xml(data), nodes)
+
+
+@case("dumps/telemetry")
+def dumps_telemetry():
+    data = corpora.telemetry()
+    return Bench(lambda: mu.dumps(data), 2 * len(data["load"]))
+
+
+@case("xml/dumps-telemetry")
+def xml_dumps_telemetry():
+    data = corpora.telemetry()
+    return Bench(lambda: mu.xml(mu.dumps(data)), 2 * len(data["load"]))
+
+
+@case("loads/telemetry")
+def loads_telemetry():
+    data = corpora.telemetry()
+    doc = mu.dumps(data)
+    return Bench(lambda: mu.loads(doc), 2 * len(data["load"]))
+
+
+@case("dumps/1m-shared-attrs")
+def dumps_1m_shared_attrs():
+    data = corpora.mixed_values()
+    return Bench(lambda: mu.dumps(data, shared_attrs=True), len(data))
+
+
+@case("dumps/1m-own-attrs")
+def dumps_1m_own_attrs():
+    data = corpora.mixed_values()
+    return Bench(lambda: mu.dumps(data), len(data))
@@ -0,0 +1,164 @@
+# Synthetic documents and payloads used by the benchmarks.
+#
+# All corpora are deterministic so results of different runs can be compared.
+#
+from __future__ import annotations
+
+import mu
+
+
+def wide_doc(n: int = 2000) -> list:
+    """A flat catalog page with many sibling elements."""
+    return [
+        "html",
+        ["head", ["title", "Catalog"], ["link", {"rel": "stylesheet", "href": "x"}]],
+        [
+            "body",
+            [
+                [
+                    "div",
+                    {"class": "item", "id": i},
+                    ["h2", f"Item {i}"],
+                    ["p", "Fish & chips <small>", ["br"], i * 1.5],
+                ]
+                for i in range(n)
+            ],
+        ],
+    ]
+
+
+def deep_doc(depth: int = 5000) -> list:
+    """A single chain of nested sections."""
+    doc = ["para", "The end."]
+    for i in range(depth):
+        doc = ["section", {"level": i}, ["title", f"Level {i}"], doc]
+    return doc
+
+
+def svg_doc(n: int = 2000) -> list:
+    """An SVG drawing where nearly all data is in attributes."""
+    return [
+        "svg",
+        {"xmlns": "http://www.w3.org/2000/svg", "viewBox": "0 0 1000 1000"},
+        [
+            [
+                "rect",
+                {
+                    "x": i % 100 * 10,
+                    "y": i // 100 * 10,
+                    "width": 8,
+                    "height": 8,
+                    "rx": 1.5,
+                    "fill": "#336699",
+                    "stroke": "none",
+                    "data-label": f"cell <{i}>",
+                },
+            ]
+            for i in range(n)
+        ],
+    ]
+
+
+def sugar_doc(n: int = 2000) -> list:
+    """An HTML page using `tag#id.class` names for most elements."""
+    return [
+        "div#app.container",
+        [
+            [
+                "div.card.shadow",
+                {"id": f"card-{i}", "class": ["wide", "shadow"]},
+                ["h3.card-title", f"Card {i}"],
+                ["p.card-text.muted", "Some text"],
+                ["a.btn.btn-primary", {"href": f"/cards/{i}"}, "Open"],
+            ]
+            for i in range(n)
+        ],
+    ]
+
+
+def plain_doc(n: int = 2000) -> list:
+    """The same page as `sugar_doc` without using sugared names."""
+    return [
+        "div",
+        {"id": "app", "class": "container"},
+        [
+            [
+                "div",
+                {"id": f"card-{i}", "class": ["card", "shadow", "wide"]},
+                ["h3", {"class": "card-title"}, f"Card {i}"],
+                ["p", {"class": ["card-text", "muted"]}, "Some text"],
+                ["a", {"class": ["btn", "btn-primary"], "href": f"/cards/{i}"}, "Open"],
+            ]
+            for i in range(n)
+        ],
+    ]
+
+
+def fragments(n: int = 2000) -> list:
+    """Small independent documents as rendered by an API, one per item."""
+    return [
+        [
+            "li.item",
+            {"data-id": i},
+            ["a", {"href": f"/items/{i}"}, f"Item {i}"],
+            ["span.price", i * 0.25],
+        ]
+        for i in range(n)
+    ]
+
+
+def payload(n: int = 2000) -> dict:
+    """A JSON-like API response."""
+    return {
+        "total": n,
+        "next": None,
+        "items": [
+            {
+                "id": i,
+                "name": f"Product {i}",
+                "price": i * 0.25,
+                "available": i % 3 == 0,
+                "tags": ["a", "b", "c"],
+                "dimensions": {"w": i, "h": i + 1, "d": 0.5},
+            }
+            for i in range(n)
+        ],
+    }
+
+
+def telemetry(n: int = 200_000) -> dict:
+    """A telemetry export with long numeric series."""
+    return {
+        "host": "web-1",
+        "timestamps": [1_700_000_000 + i for i in range(n)],
+        "load": [(i % 100) / 7 for i in range(n)],
+    }
+
+
+def mixed_values(n: int = 1_000_000) -> list:
+    """A long array of scalars that isn't packed."""
+    return [(i, i + 0.5, i % 3 == 0, None)[i % 4] for i in range(n)]
+
+
+def escape_values(n: int = 10000) -> list:
+    """Text and attribute values as they appear in typical documents."""
+    values = []
+    for i in range(n):
+        values.extend([i, i * 0.5, f"Item {i}", "Fish & chips <small>", i % 2 == 0])
+    return values
+
+
+def count_nodes(node) -> int:
+    """Number of elements and atomic values in a Mu document."""
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if mu.is_element(node):
+            count += 1
+            stack.extend(mu.content(node))
+        elif isinstance(node, list | tuple):
+            stack.extend(node)
+        elif node is not None:
+            count += 1
+    return count
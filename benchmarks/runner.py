@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.cases import CASES
+
+
+def measure(bench, repeat: int, min_time: float) -> dict:
+    """Best time per call over `repeat` rounds plus peak memory of one call."""
+    result = bench.fn()
+    size = bench.size
+    if size is None and isinstance(result, str | bytes):
+        size = len(result.encode() if isinstance(result, str) else result)
+    del result
+    # calibrate the number of calls per round
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            bench.fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            bench.fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    tracemalloc.start()
+    bench.fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "seconds": best,
+        "nodes_per_s": bench.nodes / best,
+        "mb_per_s": size / best / 1e6 if size else None,
+        "peak_kb": peak / 1024,
+    }
+
+
+def run(pattern: str | None, repeat: int, min_time: float) -> dict:
+    results = {}
+    for name, setup in CASES.items():
+        if pattern and pattern not in name:
+            continue
+        results[name] = measure(setup(), repeat, min_time)
+        print_result(name, results[name])
+    return results
+
+
+def print_header() -> None:
+    print(
+        f"{'benchmark':<20} {'ms/call':>10} {'nodes/s':>12} {'MB/s':>8} {'peak KB':>10}"
+    )
+
+
+def print_result(name: str, result: dict) -> None:
+    mb_per_s = f"{result['mb_per_s']:8.2f}" if result["mb_per_s"] else f"{'-':>8}"
+    print(
+        f"{name:<20} {result['seconds'] * 1000:10.3f} "
+        f"{result['nodes_per_s']:12,.0f} {mb_per_s} {result['peak_kb']:10,.0f}"
+    )
+
+
+def compare(base_file: str, new_file: str, threshold: float) -> int:
+    """Print the change in time per benchmark, return 1 on regressions."""
+    with open(base_file) as fp:
+        base = json.load(fp)["results"]
+    with open(new_file) as fp:
+        new = json.load(fp)["results"]
+    regressions = []
+    print(
+        f"{'benchmark':<20} {'base ms':>10} {'new ms':>10} "
+        f"{'change':>8} {'peak KB':>18}"
+    )
+    for name in [name for name in base if name in new]:
+        old_s, new_s = base[name]["seconds"], new[name]["seconds"]
+        change = (new_s - old_s) / old_s * 100
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        peak = f"{base[name]['peak_kb']:,.0f} -> {new[name]['peak_kb']:,.0f}"
+        print(
+            f"{name:<20} {old_s * 1000:10.3f} {new_s * 1000:10.3f} "
+            f"{change:+7.1f}% {peak:>18}{flag}"
+        )
+    for name in sorted(base.keys() ^ new.keys()):
+        print(f"{name:<20} only in {base_file if name in base else new_file}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than {threshold}%")
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command")
+    run_cmd = commands.add_parser("run", help="run benchmarks (default)")
+    compare_cmd = commands.add_parser("compare", help="compare two saved runs")
+    compare_cmd.add_argument("base")
+    compare_cmd.add_argument("new")
+    compare_cmd.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="percentage slowdown reported as regression (default 10)",
+    )
+    for cmd in (parser, run_cmd):
+        cmd.add_argument("-k", dest="pattern", help="only run matching benchmarks")
+        cmd.add_argument("--repeat", type=int, default=5)
+        cmd.add_argument(
+            "--min-time",
+            type=float,
+            default=0.2,
+            help="minimum seconds per round (default 0.2)",
+        )
+        cmd.add_argument("--json", dest="output", help="save results to a file")
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return compare(args.base, args.new, args.threshold)
+    print(f"Python {platform.python_version()} ({platform.platform()})")
+    print_header()
+    results = run(args.pattern, args.repeat, args.min_time)
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "argv": sys.argv,
+                    "results": results,
+                },
+                fp,
+                indent=2,
+            )
+    return 0
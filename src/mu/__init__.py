@@ -8,11 +8,30 @@
 #
 from __future__ import annotations
 
+import asyncio
+import codecs
+import collections
+import contextlib
+import contextvars
+import copy
+import dataclasses
+import functools
+import inspect
+import io
+import itertools
+import os
 import re
+import sys
+import time
+from collections.abc import Iterator
+from concurrent import futures
 from typing import Callable
 from typing import Union
 
 from mu import util
+from mu.parser import iterevents
+from mu.parser import iterparse
+from mu.parser import parse
 
 ERR_NOT_ELEMENT_NODE = ValueError("Not an element node.")
 ERR_QNAME = ValueError("Not a valid XML QName.")
@@ -23,10 +42,31 @@ QNAME_START = r"([A-Z]|_|[a-z]|[\u00C0-\u00D6]|[\u00D8-\u00F6]|[\u00F8-\u02FF]|[
 QNAME_CHAR = r"-|\.|[0-9]|\u00B7|[\u0300-\u036F]|[\u203F-\u2040]"
 QNAME = rf"^{QNAME_START}({QNAME_START}|{QNAME_CHAR})*$"
 QNAME_RE = re.compile(QNAME)
+QNAME_ASCII_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_.-]*$")
+QNAME_CACHE_SIZE = 1024
+PARALLEL_THRESHOLD = 20_000
+COMPONENT_CACHE_SIZE = 64 * 1024 * 1024
+PACKED_ARRAY_THRESHOLD = 32
+SUGAR_CACHE_SIZE = 512
+RENDERER_SNAPSHOT_DEPTH = 100
+RENDERER_MARKUP_HEIGHT = 4
+
+BUFFER_SIZE = 64 * 1024
 
 
 class Node:
-    """Base class for active markup nodes."""
+    """Base class for active markup nodes.
+
+    Nodes use `__slots__` so the built-in node classes don't carry an
+    instance `__dict__`. Subclasses that don't declare `__slots__` get one
+    as usual.
+    """
+
+    __slots__ = ("_name", "_attrs", "_content")
+
+    # Pure nodes always render the same output for the same attributes,
+    # content and call arguments so their output is memoized (see `pure`).
+    pure = False
 
     def __init__(self, name, *nodes, **attrs) -> None:
         self.set_name(name)
@@ -67,232 +107,857 @@ class Node:
         return f"<{self.tag}...>"
 
     def __call__(self, *nodes, **attrs) -> list:
-        mu = []
-        mu.append(self.tag)
-        if "cls" in attrs:
-            attrs["class"] = attrs.pop("cls")
-        attrs = self.attrs | attrs
-        if len(attrs) > 0:
-            mu.append(attrs)
-        if len(self.content) > 0:
-            mu.extend(self.content)
-        if len(nodes) > 0:
-            mu.extend(nodes)
-        return mu
+        # Without call-time attributes a copy of the node's own attribute
+        # dict is used in the result instead of a merge. The result is not
+        # shared with the node so it may be changed.
+        if attrs:
+            if "cls" in attrs:
+                attrs["class"] = attrs.pop("cls")
+            attrs = self.attrs | attrs
+        elif self.attrs:
+            attrs = self.attrs.copy()
+        if attrs:
+            return [self.tag, attrs, *self.content, *nodes]
+        return [self.tag, *self.content, *nodes]
 
 
 class Element(Node):
+    __slots__ = ()
+
     def __init__(self, name: str, *nodes, **attrs) -> None:
         super().__init__(name, *nodes, **attrs)
 
 
 class Text(Node):
+    __slots__ = ()
+
     def __init__(self, *nodes) -> None:
         super().__init__("$text", *nodes)
 
 
 class PI(Node):
+    __slots__ = ()
+
     def __init__(self, *nodes) -> None:
         super().__init__("$pi", *nodes)
 
 
 class CData(Node):
+    __slots__ = ()
+
     def __init__(self, *nodes) -> None:
         super().__init__("$cdata", *nodes)
 
 
 class Raw(Node):
+    __slots__ = ()
+
     def __init__(self, *nodes) -> None:
         super().__init__("$raw", *nodes)
 
 
 class Comment(Node):
+    __slots__ = ()
+
     def __init__(self, *nodes) -> None:
         super().__init__("$comment", *nodes)
 
 
+def pure(cls: type) -> type:
+    """Class decorator that marks a Node class as pure.
+
+    The expanded output and the markup of pure nodes is memoized in
+    `component_cache` on the node class, attributes, content and call
+    arguments. Only use it for nodes whose output depends on nothing else.
+
+    Example:
+        >>> @pure
+        ... class Icon(Node):
+        ...     def __init__(self, name):
+        ...         super().__init__("svg", ["use", {"href": f"#{name}"}])
+    """
+    cls.pure = True
+    return cls
+
+
 class SugarNames:
+    """Expands `tag#id.class` names into a tag with id and class attributes.
+
+    Templates use a small set of these names so the parsed names are kept
+    in a bounded LRU cache.
+    """
+
+    def __init__(self, maxsize: int = SUGAR_CACHE_SIZE) -> None:
+        self._parse = functools.lru_cache(maxsize=maxsize)(_parse_sugared_name)
+
     def transform(self, node: list) -> list:
         if is_element(node):
-            if self._is_sugared_name(node[0]):
-                tag = self._sugar_name(node[0])
-                attributes = self._sugar_attrs(node[0])
-                for name, value in attrs(node).items():
-                    if "id" in attributes and name == "id":
-                        # id from attr dict overrides sugar
-                        attributes["id"] = value
-                    elif "class" in attributes and name == "class":
-                        if isinstance(value, list):
-                            for cls_value in value:
-                                if cls_value not in attributes["class"]:
-                                    attributes["class"].append(cls_value)
-                        else:
-                            if value not in attributes["class"]:
-                                attributes["class"].append(value)
-                    else:
-                        attributes[name] = value
-                child_nodes = content(node)
-                unsugared_node = []
-                unsugared_node.append(tag)
-                if len(attributes) > 0:
-                    unsugared_node.append(attributes)
-                if len(child_nodes) > 0:
-                    unsugared_node.extend(child_nodes)
-                return unsugared_node
-            else:
+            sugar = self._parse(node[0])
+            if sugar is None:
                 return node
+            tag, sugar_id, sugar_cls = sugar
+            attributes = {}
+            if sugar_id is not None:
+                attributes["id"] = sugar_id
+            if sugar_cls:
+                attributes["class"] = list(sugar_cls)
+            if len(node) > 1 and isinstance(node[1], dict):
+                node_attrs, child_nodes = node[1], node[2:]
+            else:
+                node_attrs, child_nodes = {}, node[1:]
+            for name, value in node_attrs.items():
+                if sugar_id is not None and name == "id":
+                    # id from attr dict overrides sugar
+                    attributes["id"] = value
+                elif sugar_cls and name == "class":
+                    _merge_classes(
+                        attributes["class"],
+                        value if isinstance(value, list) else [value],
+                    )
+                else:
+                    attributes[name] = value
+            unsugared_node = [tag]
+            if len(attributes) > 0:
+                unsugared_node.append(attributes)
+            unsugared_node.extend([x for x in child_nodes if x is not None])
+            return unsugared_node
         else:
             return node
 
-    def _is_sugared_name(self, tag: str) -> bool:
-        return "#" in tag or "." in tag
+    def cache_info(self):
+        """Named tuple with hits, misses, maxsize and currsize."""
+        return self._parse.cache_info()
+
+    def cache_clear(self) -> None:
+        self._parse.cache_clear()
+
+
+def _parse_sugared_name(name: str) -> tuple | None:
+    # "div#main.card.wide" -> ("div", "main", ("card", "wide"))
+    if "#" not in name and "." not in name:
+        return None
+    ids = []
+    classes = []
+    for part in re.findall("[#.][^#.]+", name):
+        if part.startswith("#"):
+            ids.append(part[1:])
+        else:
+            classes.append(part[1:])
+    return (
+        re.split(r"[#.]", name)[0],
+        ids[0] if ids else None,
+        tuple(classes),
+    )
 
-    def _sugar_name(self, tag: str) -> str:
-        return re.split(r"[#.]", tag)[0]
 
-    def _sugar_attrs(self, tag: str) -> dict:
-        id = []
-        cls = []
-        for part in re.findall("[#.][^#.]+", tag):
-            if part.startswith("#"):
-                id.append(part[1:])
-            elif part.startswith("."):
-                cls.append(part[1:])
-        attrs = {}
-        if id:
-            attrs["id"] = id[0]
-        if cls:
-            attrs["class"] = cls
-        return attrs
+def _merge_classes(classes: list, values: list) -> None:
+    # appends the values that are not in classes yet
+    try:
+        seen = set(classes)
+        for value in values:
+            if value not in seen:
+                seen.add(value)
+                classes.append(value)
+    except TypeError:
+        # unhashable class values
+        for value in values:
+            if value not in classes:
+                classes.append(value)
 
 
 name_xf = SugarNames()
 
 
+def _validate_qname(name: str) -> bool:
+    # ASCII names (nearly all of them) don't need the large Unicode regex
+    name_re = QNAME_ASCII_RE if name.isascii() else QNAME_RE
+    parts = name.split(":", 2)
+    if len(parts) == 2:
+        return bool(name_re.match(parts[1]) and name_re.match(parts[0]))
+    else:
+        return bool(name_re.match(parts[0]))
+
+
+class QNameCache:
+    """Bounded LRU cache of QName validation results.
+
+    Documents use a small vocabulary of element and attribute names many
+    times over so the result of validating a name is memoized.
+    """
+
+    def __init__(self, maxsize: int = QNAME_CACHE_SIZE) -> None:
+        self.resize(maxsize)
+
+    def resize(self, maxsize: int) -> None:
+        """Set the maximum number of cached names (clears the cache)."""
+        self.is_qname = functools.lru_cache(maxsize=maxsize)(_validate_qname)
+
+    def cache_info(self):
+        """Named tuple with hits, misses, maxsize and currsize."""
+        return self.is_qname.cache_info()
+
+    def cache_clear(self) -> None:
+        self.is_qname.cache_clear()
+
+
+qname_cache = QNameCache()
+
+
+_CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize"]
+)
+
+
+class ComponentCache:
+    """LRU cache for the output of pure nodes, bounded by size.
+
+    Entries are the expanded output of a node and the markup of a node.
+    Both are sized by their approximate memory use in bytes (the
+    `sys.getsizeof` of the lists, dicts and values they hold).
+
+    Args:
+        maxsize: The least recently used entries are evicted when the total
+            size of the entries goes over this number of bytes
+    """
+
+    def __init__(self, maxsize: int = COMPONENT_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._hits = self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return default
+        self._hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: tuple, value) -> None:
+        size = _sizeof(value)
+        if size > self.maxsize:
+            return
+        if key in self._entries:
+            self._size -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._size += size
+        while self._size > self.maxsize:
+            self._size -= self._entries.popitem(last=False)[1][1]
+
+    def invalidate(self, cls: type | None = None) -> None:
+        """Remove the entries of a node class (or all entries)."""
+        if cls is None:
+            self._entries.clear()
+            self._size = 0
+            return
+        for key in [key for key in self._entries if key[0] is cls]:
+            self._size -= self._entries.pop(key)[1]
+
+    def cache_info(self):
+        """Named tuple with hits, misses, maxsize and currsize."""
+        return _CacheInfo(self._hits, self._misses, self.maxsize, self._size)
+
+    def cache_clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        self.invalidate()
+        self._hits = self._misses = 0
+
+
+def _sizeof(value) -> int:
+    # approximate memory use of a cached value, shared items are counted
+    # each time they occur
+    size = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        size += sys.getsizeof(value)
+        if isinstance(value, list | tuple):
+            stack.extend(value)
+        elif isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+    return size
+
+
+component_cache = ComponentCache()
+
+
 class XmlSerializer:
-    def __init__(self, ns: dict = {}):
+    """Renders Mu as XML markup.
+
+    With `fused=True` active nodes are expanded while the markup is written
+    instead of first building an expanded copy of the whole document with
+    `expand()`. Both modes produce the same markup.
+
+    With `indent` (a number of spaces or a string) elements that only
+    contain elements, comments and processing instructions are written one
+    per line, indented by their depth. Elements with text content (mixed
+    content) are written as they are.
+    """
+
+    def __init__(
+        self,
+        ns: dict = {},
+        qnames: QNameCache = qname_cache,
+        fused: bool = False,
+        indent: int | str | None = None,
+    ):
         self._names = name_xf
+        self._qnames = qnames
         self._ns = ns
+        self.fused = fused
+        self.indent = indent
+        self._encoding = None
 
     def write(self, *nodes):
-        return self._ser_node(expand(*nodes))
-
-    def _ser_node(self, node):
-        if is_element(node):
-            return self._ser_element(node)
-        elif _is_sequence(node):
-            return self._ser_sequence(node)
+        if self.indent is not None:
+            return "".join(self._iter_indented(expand(*nodes)))
+        if self.fused:
+            return "".join(
+                self._iter_node(nodes[0] if len(nodes) == 1 else nodes, True)
+            )
+        return "".join(self._iter_node(expand(*nodes)))
+
+    def iter_write(self, *nodes):
+        """Yield the markup of the nodes as string fragments in document order."""
+        if self.indent is not None:
+            yield from self._iter_indented(expand(*nodes))
+        elif self.fused:
+            yield from self._iter_node(nodes[0] if len(nodes) == 1 else nodes, True)
         else:
-            return self._ser_atomic(node)
-
-    def _ser_element(self, node):
-        if is_special_node(node):
-            return self._ser_special_node(node)
+            yield from self._iter_node(expand(*nodes))
+
+    def iter_events(self, events):
+        """Yield the markup of start, data and end events (see `iterevents`).
+
+        An element is written in its empty form when its end event directly
+        follows its start event. Special nodes are collected from their
+        start to their end event and written as a whole.
+        """
+        events = iter(events)
+        close_tags = []
+        event = next(events, None)
+        while event is not None:
+            kind = event[0]
+            if kind == "data":
+                text = self._ser_atomic(event[1])
+                if text is not None:
+                    yield text
+            elif kind == "end":
+                yield close_tags.pop()
+            elif isinstance(event[1], str) and event[1][:1] == "$":
+                node = [event[1]]
+                for event in events:
+                    if event[0] == "end":
+                        break
+                    node.append(event[1])
+                yield self._ser_special_node(node)
+            else:
+                name = event[1]
+                node = [name, event[2]]
+                if type(name) is str and ("#" in name or "." in name):
+                    node = self._names.transform(node)
+                event = next(events, None)
+                if event is not None and event[0] == "end":
+                    yield self._ser_empty_node(node)
+                else:
+                    yield self._start_tag(node, close=False)
+                    close_tags.append(self._close_tag(node))
+                    continue
+            event = next(events, None)
+
+    async def aiter_write(self, *nodes):
+        """Yield the markup of the nodes as string chunks in document order.
+
+        Active nodes and callables may return awaitables. The awaitables of
+        siblings are awaited concurrently and the markup that is complete
+        is yielded before waiting for the next one.
+        """
+        parts = []
+        async for fragment in self._aiter_node(nodes[0] if len(nodes) == 1 else nodes):
+            if fragment is _PENDING:
+                if parts:
+                    yield "".join(parts)
+                    parts = []
+            else:
+                parts.append(fragment)
+        if parts:
+            yield "".join(parts)
+
+    async def awrite(self, *nodes) -> str:
+        """Render the nodes, awaiting awaitables returned by active nodes."""
+        return "".join([chunk async for chunk in self.aiter_write(*nodes)])
+
+    def dump(self, fp, *nodes, encoding="utf-8", buffer_size=BUFFER_SIZE):
+        """Write the markup of the nodes to a text or binary file object.
+
+        Fragments are collected in a buffer that is written out with a single
+        `fp.write()` call whenever it holds `buffer_size` characters or more.
+        For binary file objects the buffer is encoded using `encoding`.
+        """
+        if _is_binary_file(fp):
+            serializer = _with_encoding(self, encoding)
+            blocks = _iter_blocks(serializer.iter_write(*nodes), buffer_size)
+            blocks = _iter_encoded(blocks, encoding)
+        else:
+            blocks = _iter_blocks(self.iter_write(*nodes), buffer_size)
+        for block in blocks:
+            fp.write(block)
+
+    def write_bytes(self, *nodes, encoding="utf-8") -> bytes:
+        """Render the nodes as encoded markup.
+
+        The markup is encoded in blocks while it is written so the complete
+        markup never exists as a string. Characters in text and attribute
+        values that can't be encoded are written as numeric character
+        references (e.g. use "ascii" to produce 7-bit output). In names,
+        comments, CDATA sections and processing instructions they raise a
+        UnicodeEncodeError.
+        """
+        serializer = _with_encoding(self, encoding)
+        return b"".join(
+            _iter_encoded(_iter_blocks(serializer.iter_write(*nodes)), encoding)
+        )
+
+    def write_into(self, buffer, *nodes, encoding="utf-8", offset=0) -> int:
+        """Render the nodes as encoded markup into a writable buffer.
+
+        A `bytearray` is extended with the markup. Other buffers (e.g. a
+        `memoryview`) are written to from `offset` on and a ValueError is
+        raised if the markup doesn't fit. Returns the number of bytes written.
+        """
+        serializer = _with_encoding(self, encoding)
+        blocks = _iter_encoded(_iter_blocks(serializer.iter_write(*nodes)), encoding)
+        written = 0
+        if isinstance(buffer, bytearray):
+            for block in blocks:
+                buffer += block
+                written += len(block)
         else:
+            view = memoryview(buffer).cast("B")
+            for block in blocks:
+                end = offset + written + len(block)
+                if end > len(view):
+                    raise ValueError("Buffer too small for markup.")
+                view[offset + written : end] = block
+                written += len(block)
+        return written
+
+    def compile(self, *nodes) -> Template:
+        """Pre-render the static parts of the nodes into a `Template`."""
+        node = nodes[0] if len(nodes) == 1 else nodes
+        holes = set()
+        _find_holes(node, holes)
+        segments = []
+        self._compile_node(node, holes, segments)
+        return Template(segments, self)
+
+    def _compile_node(self, node, holes: set, segments: list, is_content=False) -> None:
+        if id(node) not in holes:
+            _append_segment(segments, self.write(node))
+        elif _is_compiled_element(node, holes):
             node = self._names.transform(node)
-            if _is_empty_node(node):
-                return self._ser_empty_node(node)
-            else:  # content to process
-                return self._ser_content_node(node)
+            _append_segment(segments, self._start_tag(node, close=False))
+            for child in content(node):
+                self._compile_node(child, holes, segments, is_content=True)
+            _append_segment(segments, self._close_tag(node))
+        elif _is_compiled_sequence(node, holes):
+            for child in node:
+                if child is not None:
+                    self._compile_node(child, holes, segments)
+        else:
+            segments.append(_Hole(node, is_content))
+
+    def _write_content(self, node) -> str:
+        # a node in element content, a tuple returned by an active node is
+        # flattened like in _iter_node
+        node = expand(node)
+        if isinstance(node, tuple):
+            return "".join(["".join(self._iter_node(item)) for item in node])
+        return "".join(self._iter_node(node))
+
+    def _split_node(self, node, depth: int, segments: list, is_content=False):
+        # Splits an expanded node into the markup above depth and the
+        # subtrees at depth, which can be serialized independently.
+        if is_content and isinstance(node, tuple):
+            for child in node:
+                self._split_node(child, depth, segments)
+        elif is_element(node) and not is_special_node(node):
+            if depth == 0:
+                segments.append(_Chunk(node))
+                return
+            node = self._names.transform(node)
+            child_nodes = content(node)
+            if len(child_nodes) == 0:
+                segments.append(self._ser_empty_node(node))
+            else:
+                segments.append(self._start_tag(node, close=False))
+                for child in child_nodes:
+                    self._split_node(child, depth - 1, segments, is_content=True)
+                segments.append(self._close_tag(node))
+        elif _is_sequence(node) and not is_special_node(node):
+            for child in node:
+                self._split_node(child, depth, segments)
+        else:
+            segments.append("".join(self._iter_node(node)))
+
+    def _iter_node(self, node, fused: bool = False):
+        # Walks the tree with an explicit stack so deeply nested documents
+        # don't run into the recursion limit. Each frame holds an iterator over
+        # the children, the close tag (if any), whether the children are
+        # element content (in which tuples are flattened) and whether the
+        # children still have to be expanded (fused mode).
+        if fused:
+            stack = [(iter(_resolve_nodes((node,))), None, False, True)]
+        else:
+            stack = [(iter((node,)), None, False, False)]
+        while stack:
+            children, close_tag, is_content, is_raw = stack[-1]
+            for child in children:
+                # Fast path for expanded elements and text: the node is
+                # classified once on its exact type and the children are
+                # iterated in place.
+                child_type = type(child)
+                if child_type is str:
+                    text = self._ser_atomic(child)
+                    if text is not None:
+                        yield text
+                    continue
+                if child_type is list or (child_type is tuple and not is_content):
+                    name = child[0] if child else None
+                    if type(name) is str and name[:1] != "$":
+                        node = child
+                        if "#" in name or "." in name:
+                            child = self._names.transform(child)
+                        size = len(child)
+                        start = 2 if size > 1 and isinstance(child[1], dict) else 1
+                        while start < size and child[start] is None:
+                            start += 1
+                        if start == size:
+                            yield self._ser_empty_node(child)
+                            continue
+                        first = child[start]
+                        # in fused mode the children are resolved as they are
+                        # written unless the first one may become the
+                        # attributes
+                        if (
+                            not is_raw
+                            or type(first) is str
+                            or not (
+                                isinstance(first, dict) or _is_active_element(first)
+                            )
+                        ):
+                            yield self._start_tag(child, close=False)
+                            stack.append(
+                                (
+                                    itertools.islice(child, start, None),
+                                    self._close_tag(child),
+                                    True,
+                                    is_raw,
+                                )
+                            )
+                            break
+                        child = node
+                if is_raw:
+                    child = _resolve_node(child)
+                    if type(child) is _Expanded:
+                        if child.key is not None and not (
+                            is_content and isinstance(child.node, tuple)
+                        ):
+                            yield self._pure_markup(child)
+                            continue
+                        # output of an active node is serialized as it is
+                        stack.append((iter((child.node,)), None, is_content, False))
+                        break
+                elif is_content and isinstance(child, tuple):
+                    stack.append((iter(child), None, False, False))
+                    break
+                if is_element(child):
+                    if is_special_node(child):
+                        if is_raw:
+                            child = _expand_nodes(child)
+                        yield self._ser_special_node(child)
+                        continue
+                    if is_raw:
+                        child_nodes = _resolve_nodes(content(child))
+                        if (
+                            child_nodes
+                            and not has_attrs(child)
+                            and isinstance(_unwrap(child_nodes[0]), dict)
+                        ):
+                            # expanded child ends up in the attributes position
+                            child = [tag(child), *_expand_resolved(child_nodes)]
+                            stack.append((iter((child,)), None, False, False))
+                            break
+                        child_nodes = [x for x in child_nodes if not _is_null(x)]
+                        child = self._names.transform(child)
+                    else:
+                        child = self._names.transform(child)
+                        child_nodes = content(child)
+                    if len(child_nodes) == 0:
+                        yield self._ser_empty_node(child)
+                    else:  # content to process
+                        yield self._start_tag(child, close=False)
+                        stack.append(
+                            (iter(child_nodes), self._close_tag(child), True, is_raw)
+                        )
+                        break
+                elif _is_sequence(child):
+                    # a sequence, list would imply a malformed element
+                    if is_raw:
+                        child = _resolve_nodes(child)
+                        if child and is_element([_unwrap(child[0])]):
+                            # expanded sequence turns out to be an element
+                            child = _expand_resolved(child)
+                            stack.append((iter((child,)), None, False, False))
+                            break
+                        child = [x for x in child if not _is_null(x)]
+                    stack.append((iter(child), None, False, is_raw))
+                    break
+                else:
+                    text = self._ser_atomic(child)
+                    if text is not None:
+                        yield text
+            else:
+                stack.pop()
+                if close_tag is not None:
+                    yield close_tag
+
+    def _iter_indented(self, node):
+        # Same walk as _iter_node over an expanded node but each frame holds
+        # the element children (see _element_children) and the line break
+        # that goes before them. Mixed content is passed to _iter_node.
+        space = " " * self.indent if isinstance(self.indent, int) else self.indent
+        children = _element_children((node,), False)
+        if children is None:
+            yield from self._iter_node(node)
+            return
+        stack = [(iter(children), None, "\n")]
+        started = False
+        while stack:
+            children, close_tag, newline = stack[-1]
+            for child in children:
+                if started:
+                    yield newline
+                started = True
+                if is_special_node(child):
+                    yield self._ser_special_node(child)
+                    continue
+                child = self._names.transform(child)
+                child_nodes = content(child)
+                if len(child_nodes) == 0:
+                    yield self._ser_empty_node(child)
+                    continue
+                child_nodes = _element_children(child_nodes)
+                if not child_nodes or self._preserves_space(child):
+                    yield from self._iter_node(child)
+                else:
+                    yield self._start_tag(child, close=False)
+                    stack.append(
+                        (
+                            iter(child_nodes),
+                            newline + self._close_tag(child),
+                            newline + space,
+                        )
+                    )
+                    break
+            else:
+                stack.pop()
+                if close_tag is not None:
+                    yield close_tag
+
+    def _preserves_space(self, node) -> bool:
+        return attrs(node).get("xml:space") == "preserve"
+
+    async def _aiter_node(self, node):
+        # The fused walk of _iter_node for awaitable output. Active nodes are
+        # resolved in tasks that are started before the walk reaches them
+        # (see _start_nested). _PENDING is yielded before waiting for a task
+        # that isn't done.
+        tasks = []
+        started = {}
+        _start_nested((node,), tasks, started)
+        stack = [(iter(_start_resolving((node,), tasks, started)), None, False)]
+        try:
+            while stack:
+                children, close_tag, is_content = stack[-1]
+                for child in children:
+                    if isinstance(child, asyncio.Future):
+                        if not child.done():
+                            yield _PENDING
+                        child = await child
+                        if type(child) is not _Expanded:
+                            _start_nested((child,), tasks, started)
+                    if type(child) is _Expanded:
+                        # output of an active node is serialized as it is
+                        if is_content and isinstance(child.node, tuple):
+                            for item in child.node:
+                                for fragment in self._iter_node(item):
+                                    yield fragment
+                        else:
+                            for fragment in self._iter_node(child.node):
+                                yield fragment
+                    elif is_element(child) or _is_sequence(child):
+                        if is_special_node(child):
+                            yield self._ser_special_node(_expand_nodes(child))
+                            continue
+                        if is_element(child):
+                            child_nodes = _start_resolving(
+                                content(child), tasks, started
+                            )
+                            head = []
+                            if not has_attrs(child):
+                                head = child_nodes[:1]
+                                child = [tag(child)]
+                        else:
+                            child_nodes = _start_resolving(child, tasks, started)
+                            async for fragment in _await_nodes(child_nodes[:1]):
+                                yield fragment
+                            head = [_unwrap(x) for x in _results(child_nodes[:1])]
+                            if not is_element(head):
+                                stack.append((iter(child_nodes), None, False))
+                                break
+                            # expanded sequence turns out to be an element
+                            child = head
+                            del child_nodes[0]
+                            head = child_nodes[:1]
+                        async for fragment in _await_nodes(head):
+                            yield fragment
+                        if head and isinstance(_unwrap(_results(head)[0]), dict):
+                            # expanded child ends up in the attributes
+                            child.append(_unwrap(_results(head)[0]))
+                            del child_nodes[0]
+                        if is_special_node(child):
+                            async for fragment in _await_nodes(child_nodes):
+                                yield fragment
+                            child.extend(_expand_resolved(_results(child_nodes)))
+                            yield self._ser_special_node(child)
+                            continue
+                        if all(isinstance(x, asyncio.Future) for x in child_nodes):
+                            # can't tell if the element is empty until the
+                            # active children are resolved
+                            async for fragment in _await_nodes(child_nodes):
+                                yield fragment
+                            child_nodes = [
+                                x for x in _results(child_nodes) if not _is_null(x)
+                            ]
+                        child = self._names.transform(child)
+                        if len(child_nodes) == 0:
+                            yield self._ser_empty_node(child)
+                        else:
+                            yield self._start_tag(child, close=False)
+                            stack.append(
+                                (iter(child_nodes), self._close_tag(child), True)
+                            )
+                            break
+                    else:
+                        text = self._ser_atomic(child)
+                        if text is not None:
+                            yield text
+                else:
+                    stack.pop()
+                    if close_tag is not None:
+                        yield close_tag
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _pure_markup(self, expanded: _Expanded) -> str:
+        key = (*expanded.key, self)
+        markup = component_cache.get(key)
+        if markup is None:
+            markup = "".join(self._iter_node(expanded.node))
+            component_cache.put(key, markup)
+        return markup
 
     def _start_tag(self, node, close: bool = False, xhtml=False):
-        if self._is_qname(tag(node)):
+        # only called for elements so the tag is read directly
+        name = node[0]
+        if self._is_qname(name):
             if close is True:
                 if xhtml is True:
-                    return f"<{tag(node)}{self._ser_attrs(node)} />"
+                    return f"<{name}{self._ser_attrs(node)} />"
                 else:
-                    return f"<{tag(node)}{self._ser_attrs(node)}/>"
+                    return f"<{name}{self._ser_attrs(node)}/>"
             else:
-                return f"<{tag(node)}{self._ser_attrs(node)}>"
+                return f"<{name}{self._ser_attrs(node)}>"
         else:
             raise ERR_QNAME
 
-    def _ser_content_node(self, node):
-        n = []
-        n.append(self._start_tag(node, close=False))
-        for child in content(node):
-            if isinstance(child, tuple):
-                for x in child:
-                    n.append(self._ser_node(x))
-            else:
-                n.append(self._ser_node(child))
-        n.append(self._close_tag(node))
-        return "".join(n)
-
     def _close_tag(self, node):
-        return f"</{tag(node)}>"
+        return f"</{node[0]}>"
 
     def _ser_empty_node(self, node):
         return self._start_tag(node, close=True)
 
-    def _ser_sequence(self, node):
-        # a sequence, list would imply a malformed element
-        n = []
-        for x in node:
-            n.append(self._ser_node(x))
-        return "".join(n)
-
     def _ser_atomic(self, node):
         if node:
-            return util.escape_html(node)
+            return util.escape_text(node)
         else:
             pass
 
     def _is_qname(self, name: str) -> bool:
-        parts = re.split(":", name, 2)
-        if len(parts) == 2:
-            if QNAME_RE.match(parts[1]) and QNAME_RE.match(parts[0]):
-                return True
-            else:
-                return False
-        else:
-            if QNAME_RE.match(parts[0]):
-                return True
-            else:
-                return False
+        if self._encoding is not None:
+            # character references can't be used in names
+            name.encode(self._encoding)
+        return self._qnames.is_qname(name)
 
     def _ser_attrs(self, node) -> str:
-        node_attrs = attrs(node)
+        if len(node) < 2 or not isinstance(node[1], dict) or not node[1]:
+            return ""
+        is_qname = self._is_qname
+        escape_attr = util.escape_attr
         output = []
-        for name, value in sorted(node_attrs.items()):
-            if self._is_qname(name):
-                if value is None:
-                    pass
-                elif isinstance(value, bool):
-                    if value:
-                        output.append(f" {self._bool_attr(name, value)}")
-                elif isinstance(value, list | tuple):
-                    output.append(
-                        f' {name}="{util.escape_html(" ".join([str(item) for item in value]))}"',  # noqa
-                    )
-                else:
-                    output.append(f' {name}="{util.escape_html(value)}"')
-            else:
+        for name, value in sorted(node[1].items()):
+            if not is_qname(name) or value is None:
                 # just drop non qnames
-                pass
+                continue
+            if type(value) is str:
+                output.append(f' {name}="{escape_attr(value)}"')
+            elif isinstance(value, bool):
+                if value:
+                    output.append(f" {self._bool_attr(name, value)}")
+            elif isinstance(value, list | tuple):
+                output.append(
+                    f' {name}="{escape_attr(" ".join([str(item) for item in value]))}"',
+                )
+            else:
+                output.append(f' {name}="{escape_attr(value)}"')
         return "".join(output)
 
     def _bool_attr(self, name, value):
         return f'{name}="{name}"'
 
+    def _unescaped(self, text: str) -> str:
+        # text in which character references aren't recognized
+        if self._encoding is not None:
+            text.encode(self._encoding)
+        return text
+
     def _ser_special_node(self, node: list) -> str:
         if tag(node) == "$comment":
-            cmt = "".join(node[1:])
+            cmt = self._unescaped("".join(node[1:]))
             # -- is not allowed inside comment text
             return f"<!-- {cmt.replace('--', '&#8208;&#8208;')} -->"
         elif tag(node) == "$cdata":
-            return f"<![CDATA[{''.join(node[1:])}]]>"
+            return f"<![CDATA[{self._unescaped(''.join(node[1:]))}]]>"
         elif tag(node) == "$raw":
             return "".join(node[1:])
         elif tag(node) == "$pi":
-            return f"<?{' '.join(node[1:])}?>"
+            return f"<?{self._unescaped(' '.join(node[1:]))}?>"
         elif tag(node) == "$text":
-            return util.escape_html("".join(node[1:]))
+            return util.escape_text("".join(node[1:]))
         else:
             return ""
 
 
 HTML_EMPTY_ELEMENTS = ["br", "link"]
+HTML_PRESERVE_SPACE_ELEMENTS = ["pre", "textarea", "script", "style"]
 
 
 class SgmlSerializer(XmlSerializer):
@@ -311,6 +976,11 @@ class HtmlSerializer(SgmlSerializer):
         else:
             return self._start_tag(node, close=False) + self._close_tag(node)
 
+    def _preserves_space(self, node) -> bool:
+        return tag(node) in HTML_PRESERVE_SPACE_ELEMENTS or super()._preserves_space(
+            node
+        )
+
 
 class XhtmlSerializer(XmlSerializer):
     def _ser_empty_node(self, node):
@@ -329,6 +999,395 @@ serializers = {
 }
 
 
+class Slot:
+    """A named hole in a template that is filled in when it is rendered."""
+
+    def __init__(self, name: str, default=None) -> None:
+        self.name = name
+        self.default = default
+
+    def __repr__(self):
+        return f"<Slot {self.name}>"
+
+
+class Template:
+    """A Mu document with its static parts rendered ahead of time.
+
+    Created with `compile()`. Dynamic parts (slots, active nodes and
+    callables) are rendered on each call to `render()`.
+    """
+
+    def __init__(self, segments: list, serializer: XmlSerializer) -> None:
+        self._segments = segments
+        self._serializer = serializer
+
+    def render(self, **slots) -> str:
+        """Render the template filling each `Slot` with its keyword argument."""
+        write = self._serializer.write
+        write_content = self._serializer._write_content
+        return "".join(
+            [
+                segment
+                if type(segment) is str
+                else (write_content if segment.is_content else write)(
+                    segment.fill(slots)
+                )
+                for segment in self._segments
+            ]
+        )
+
+
+class _Hole:
+    def __init__(self, node, is_content: bool) -> None:
+        self.node = node
+        self.is_content = is_content
+
+    def fill(self, slots: dict):
+        return _fill_slots(self.node, slots)
+
+
+def _find_holes(node, holes: set) -> bool:
+    # collects the ids of all nodes that (contain nodes that) can only be
+    # rendered when the template is rendered
+    if isinstance(node, Slot) or _is_active_node(node):
+        found = True
+    elif isinstance(node, list | tuple):
+        found = False
+        for child in node:
+            if _find_holes(child, holes):
+                found = True
+    elif isinstance(node, dict):
+        found = False
+        for value in node.values():
+            if _find_holes(value, holes):
+                found = True
+    else:
+        found = False
+    if found:
+        holes.add(id(node))
+    return found
+
+
+def _is_compiled_element(node, holes: set) -> bool:
+    # Tags can only be rendered ahead of time if the element keeps its content
+    # no matter what the holes render to. A static child guarantees that. A
+    # dict (or a hole that may render to one) in front of the content of an
+    # element without attributes becomes the attributes.
+    if (
+        not is_element(node)
+        or is_special_node(node)
+        or _is_active_element(node)
+        or id(attrs(node)) in holes
+    ):
+        return False
+    children = content(node)
+    if (
+        children
+        and not has_attrs(node)
+        and (id(children[0]) in holes or isinstance(children[0], dict))
+    ):
+        return False
+    return any(id(child) not in holes for child in children)
+
+
+def _is_compiled_sequence(node, holes: set) -> bool:
+    # The items of a sequence are rendered one by one unless a hole at its
+    # head may render to a tag, which makes the sequence an element.
+    if not _is_sequence(node) or is_element(node):
+        return False
+    first = next((child for child in node if child is not None), None)
+    return not (is_element([first]) or isinstance(first, Slot) or callable(first))
+
+
+def _fill_slots(node, slots: dict):
+    if isinstance(node, Slot):
+        return slots.get(node.name, node.default)
+    elif isinstance(node, list | tuple):
+        return type(node)(_fill_slots(child, slots) for child in node)
+    elif isinstance(node, dict):
+        return {name: _fill_slots(value, slots) for name, value in node.items()}
+    else:
+        return node
+
+
+def _append_segment(segments: list, text: str) -> None:
+    if segments and type(segments[-1]) is str:
+        segments[-1] += text
+    else:
+        segments.append(text)
+
+
+class Renderer:
+    """Renders a changing document, re-serializing only what changed.
+
+    The markup of each element (and sequence) is kept between renders
+    along with a snapshot of the element, identified by the object identity
+    of its list. An element is reused when it is equal to its snapshot,
+    which also detects changes made in place. Values only count as equal
+    if their types match too, 1, 1.0 and True render differently. Changed
+    elements are re-rendered from the markup of their unchanged children.
+    Elements containing active nodes or callables are rendered on every
+    call.
+
+    The document is walked with an explicit stack and elements keep
+    offsets into the markup of the whole document instead of a copy of
+    their markup, so deeply nested documents take linear time and memory.
+    Elements nested more than `RENDERER_SNAPSHOT_DEPTH` levels deep are
+    re-rendered from the markup of their children on every call.
+
+    Example:
+        >>> renderer = Renderer(method="html")
+        >>> doc = ["ul", ["li", "one"], ["li", "two"]]
+        >>> renderer.render(doc)
+        '<ul><li>one</li><li>two</li></ul>'
+        >>> doc[2][1] = "three"
+        >>> renderer.render(doc)
+        '<ul><li>one</li><li>three</li></ul>'
+        >>> renderer.reused, renderer.rendered
+        (1, 2)
+    """
+
+    def __init__(self, method: str = "xml") -> None:
+        self._serializer = serializers[method]
+        self._entries = {}
+        self.reused = 0
+        self.rendered = 0
+
+    def render(self, *nodes) -> str:
+        """Render the nodes, `reused` and `rendered` count the elements."""
+        self.reused = self.rendered = 0
+        node = nodes[0] if len(nodes) == 1 else nodes
+        entries = self._entries
+        fragments = []
+        position = 0
+        # the entries are only changed once the whole document is rendered
+        created = []
+        moved = []
+        root = {}
+        # frames: children, close tag, is content, list, start position, start
+        # index in fragments, child entries
+        stack = [(iter((node,)), None, False, None, 0, 0, root)]
+        while stack:
+            children, close_tag, is_content, parent, start, index, child_entries = (
+                stack[-1]
+            )
+            for child in children:
+                entry = entries.get(id(child))
+                if (
+                    entry is not None
+                    and entry.node is child
+                    and entry.snapshot is not None
+                    and child == entry.snapshot
+                ):
+                    markup = entry.markup[entry.start : entry.end]
+                    if entry.height > RENDERER_MARKUP_HEIGHT:
+                        moved.append((entry, position - entry.start))
+                    child_entries[id(child)] = entry
+                    self.reused += entry.count
+                elif not _is_entry_node(child):
+                    markup = self._render_leaf(child, is_content)
+                else:
+                    started = self._start_list(child)
+                    if started is not None:
+                        markup, grandchildren, close = started
+                        stack.append(
+                            (
+                                iter(grandchildren),
+                                close,
+                                is_element(child),
+                                child,
+                                position,
+                                len(fragments),
+                                {},
+                            )
+                        )
+                        fragments.append(markup)
+                        position += len(markup)
+                        break
+                    markup = self._render_active(child, False)
+                fragments.append(markup)
+                position += len(markup)
+            else:
+                stack.pop()
+                if parent is None:
+                    continue
+                if close_tag is not None:
+                    fragments.append(close_tag)
+                    position += len(close_tag)
+                entry = _RenderEntry(parent, start, position, child_entries)
+                if entry.height <= RENDERER_MARKUP_HEIGHT:
+                    # small elements keep their own markup
+                    fragments[index:] = ["".join(fragments[index:])]
+                    entry.markup = fragments[index]
+                    entry.start = 0
+                    entry.end = position - start
+                stack[-1][6][id(parent)] = entry
+                created.append(entry)
+                self.rendered += 1
+        markup = "".join(fragments)
+        # a list that occurs more than once points at its first occurrence
+        seen = set()
+        for entry, offset in moved:
+            self._move(entry, offset, markup, seen)
+        for entry in created:
+            if entry.markup is None:
+                entry.markup = markup
+            entries[id(entry.node)] = entry
+        # drop the entries of elements that are no longer in the document
+        entry = root.get(id(node))
+        if len(entries) > 2 * (entry.count if entry else 0) + 100:
+            self._entries = {}
+            if entry is not None:
+                self._keep(entry)
+        return markup
+
+    def clear(self) -> None:
+        """Forget all rendered markup."""
+        self._entries = {}
+
+    def _start_list(self, node) -> tuple | None:
+        # The start tag, children and close tag of an element or sequence.
+        # None if the list is rendered as a whole.
+        if is_element(node):
+            element = self._serializer._names.transform(node)
+            children = content(element)
+            if all(_is_active_element(child) for child in children):
+                # empty, or its content depends on the active children
+                return None
+            if not has_attrs(node) and (
+                isinstance(children[0], dict) or _is_active_element(children[0])
+            ):
+                # the first child may end up in the attributes position
+                return None
+            return (
+                self._serializer._start_tag(element, close=False),
+                children,
+                self._serializer._close_tag(element),
+            )
+        children = [child for child in node if child is not None]
+        if children and (is_element(children) or _is_active_element(children[0])):
+            # expand() drops the None in front of the tag, and an active
+            # first item may render to a tag
+            return None
+        return "", children, None
+
+    def _render_leaf(self, node, is_content: bool) -> str:
+        if _is_active_element(node):
+            return self._render_active(node, is_content)
+        return "".join(self._serializer._iter_node(_expand_nodes(node)))
+
+    def _move(self, entry, offset: int, markup: str, seen: set) -> None:
+        # points a reused entry and the entries below it at the new markup
+        stack = [entry]
+        while stack:
+            entry = stack.pop()
+            if entry.height <= RENDERER_MARKUP_HEIGHT or id(entry) in seen:
+                continue
+            seen.add(id(entry))
+            entry.markup = markup
+            entry.start += offset
+            entry.end += offset
+            stack.extend(entry.children)
+
+    def _render_active(self, node, is_content: bool) -> str:
+        self.rendered += 1
+        node = expand(node)
+        if is_content and isinstance(node, tuple):
+            # output of an active node in content position is flattened
+            return "".join(["".join(self._serializer._iter_node(x)) for x in node])
+        return "".join(self._serializer._iter_node(node))
+
+    def _keep(self, entry) -> None:
+        stack = [entry]
+        while stack:
+            entry = stack.pop()
+            self._entries[id(entry.node)] = entry
+            stack.extend(entry.children)
+
+
+class _RenderEntry:
+    # The markup of an element (or sequence) is markup[start:end], markup is
+    # set once the whole document is rendered. The snapshot is a copy of the
+    # element that compares equal to it while it renders the same (see
+    # _Typed), it's None if the element is always rendered.
+    __slots__ = (
+        "node",
+        "snapshot",
+        "markup",
+        "start",
+        "end",
+        "children",
+        "count",
+        "height",
+    )
+
+    def __init__(self, node, start: int, end: int, children: dict) -> None:
+        self.node = node
+        self.markup = None
+        self.start = start
+        self.end = end
+        self.children = list(children.values())
+        self.count = 1 + sum(child.count for child in self.children)
+        self.height = 1 + max([child.height for child in self.children], default=0)
+        self.snapshot = _render_snapshot(node, children)
+
+
+class _Typed:
+    # Stands in for a value in a snapshot, values of other types don't
+    # compare equal as 1, 1.0 and True render differently.
+    __slots__ = ("value",)
+
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def __eq__(self, other) -> bool:
+        return type(other) is type(self.value) and other == self.value
+
+
+def _typed(node):
+    # the snapshot of a node that isn't an element kept by the Renderer
+    if type(node) is str or node is None:
+        return node
+    if type(node) is list or type(node) is tuple:
+        return type(node)([_typed(item) for item in node])
+    if type(node) is dict:
+        return {name: _typed(value) for name, value in node.items()}
+    if _is_active_node(node) or isinstance(node, list | tuple | dict):
+        raise TypeError("Not static")
+    return _Typed(node)
+
+
+def _render_snapshot(node, children: dict):
+    # The snapshot shares the snapshots of the children. Snapshots are
+    # compared with ==, which recurses, so elements nested deeper than
+    # RENDERER_SNAPSHOT_DEPTH don't get one.
+    snapshot = []
+    for item in node:
+        entry = children.get(id(item))
+        if entry is not None:
+            if entry.snapshot is None or entry.height >= RENDERER_SNAPSHOT_DEPTH:
+                return None
+            snapshot.append(entry.snapshot)
+        elif _is_entry_node(item) and (not is_element(item) or content(item)):
+            # rendered as a whole
+            return None
+        else:
+            try:
+                snapshot.append(_typed(item))
+            except TypeError:
+                return None
+    return type(node)(snapshot)
+
+
+def _is_entry_node(node) -> bool:
+    # lists the Renderer keeps the markup of
+    return (
+        isinstance(node, list | tuple)
+        and not is_special_node(node)
+        and not (is_element(node) and _is_active_node(node[0]))
+    )
+
+
 def is_element(node) -> bool:
     return (
         isinstance(node, list | tuple)
@@ -417,35 +1476,327 @@ def _is_sequence(node) -> bool:
     return isinstance(node, list | tuple)
 
 
+def _element_children(nodes, is_content=True) -> list | None:
+    """The elements in the nodes with the sequences flattened.
+
+    Returns None if the nodes contain text (or `$raw`, `$cdata` and `$text`
+    nodes) and can't be indented. Special nodes that don't produce markup
+    are left out.
+    """
+    children = []
+    stack = [(iter(nodes), is_content)]
+    while stack:
+        nodes, is_content = stack[-1]
+        for node in nodes:
+            if node is None:
+                continue
+            if is_content and isinstance(node, tuple):
+                stack.append((iter(node), False))
+                break
+            if is_element(node):
+                if is_special_node(node):
+                    if node[0] in ("$raw", "$cdata", "$text"):
+                        return None
+                    if node[0] not in ("$comment", "$pi"):
+                        continue
+                children.append(node)
+            elif _is_sequence(node):
+                stack.append((iter(node), False))
+                break
+            elif node:
+                return None
+        else:
+            stack.pop()
+    return children
+
+
+def _is_binary_file(fp) -> bool:
+    if isinstance(fp, io.TextIOBase):
+        return False
+    if isinstance(fp, io.RawIOBase | io.BufferedIOBase):
+        return True
+    return "b" in getattr(fp, "mode", "")
+
+
+def _iter_blocks(chunks, size: int = BUFFER_SIZE):
+    # joins string fragments into blocks of at least size characters
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer)
+            buffer.clear()
+            length = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _iter_encoded(blocks, encoding: str):
+    for block in blocks:
+        yield block.encode(encoding, "xmlcharrefreplace")
+
+
 def _is_empty_node(node) -> bool:
     return len(content(node)) == 0
 
 
-def _expand_nodes(node):
+class _Expanded:
+    # wraps the output of an active node in content position, this output is
+    # not expanded any further, key is set for the output of pure nodes
+    def __init__(self, node, key=None) -> None:
+        self.node = node
+        self.key = key
+
+
+_MISSING = object()
+
+
+def _is_pure(node) -> bool:
+    return getattr(node, "pure", False) is True
+
+
+def _freeze(node):
+    # hashable key for a Mu node, types are kept as 1 and True render
+    # differently
+    if type(node) is str:
+        return node
+    if isinstance(node, list | tuple):
+        return (type(node), *[_freeze(x) for x in node])
+    if isinstance(node, dict):
+        return (dict, *[(k, _freeze(v)) for k, v in node.items()])
+    if isinstance(node, Node):
+        if not _is_pure(node):
+            raise TypeError("Impure node")
+        return (type(node), _freeze(node.attrs), _freeze(node.content))
+    if callable(node):
+        raise TypeError("Impure node")
+    hash(node)
+    return (type(node), node)
+
+
+def _copy_expanded(node):
+    # Copies the lists, tuples and dicts of the cached output of a pure node
+    # so the output handed out by expand() can be changed. Tuples are copied
+    # as lists first and turned back into tuples once their items are copied.
+    root = [node]
+    stack = [root]
+    tuples = []
+    while stack:
+        container = stack.pop()
+        keys = list(container) if type(container) is dict else range(len(container))
+        for key in keys:
+            item = container[key]
+            item_type = type(item)
+            if item_type is list or item_type is tuple:
+                container[key] = item = list(item)
+                if item_type is tuple:
+                    tuples.append((container, key))
+                stack.append(item)
+            elif item_type is dict:
+                container[key] = item = dict(item)
+                stack.append(item)
+    for container, key in reversed(tuples):
+        container[key] = tuple(container[key])
+    return root[0]
+
+
+def _expand_pure(node) -> _Expanded:
+    # node is a pure node or an element with a pure node in tag position
     if is_element(node):
-        node_tag = tag(node)
-        node_attrs = attrs(node)
-        node_content = content(node)
+        component, args, kwargs = node[0], content(node), attrs(node)
+    else:
+        component, args, kwargs = node, [], {}
+    try:
+        key = (
+            type(component),
+            is_element(node),
+            _freeze(component.attrs),
+            _freeze(component.content),
+            _freeze(args),
+            _freeze(kwargs),
+        )
+    except TypeError:
+        key = None
+    else:
+        expanded = component_cache.get(key, _MISSING)
+        if expanded is not _MISSING:
+            return _Expanded(expanded, key)
+    if is_element(node):
+        expanded = _expand_nodes(component(*args, **kwargs))
+    else:
+        expanded = component()
+    if key is not None:
+        component_cache.put(key, expanded)
+    return _Expanded(expanded, key)
+
+
+def _resolve_node(node):
+    while is_element(node) and _is_active_node(node[0]):
+        # in tag position
+        if _is_pure(node[0]):
+            return _expand_pure(node)
+        node = node[0](*content(node), **attrs(node))
+    if _is_active_node(node):
+        # not in tag position
+        if _is_pure(node):
+            return _expand_pure(node)
+        return _Expanded(node())
+    return node
+
+
+_PENDING = object()
+
+
+async def _aresolve_node(node):
+    # _resolve_node for active nodes that may return awaitables
+    while is_element(node) and _is_active_node(node[0]):
+        # in tag position
+        node = node[0](*content(node), **attrs(node))
+        if inspect.isawaitable(node):
+            node = await node
+    if _is_active_node(node):
+        # not in tag position
+        node = node()
+        if inspect.isawaitable(node):
+            node = await node
+        return _Expanded(node)
+    return node
+
+
+def _start_resolving(nodes, tasks: list, started: dict) -> list:
+    # Drops literal None and resolves the active nodes concurrently, each in
+    # a task that takes its place in the list. Tasks started ahead of the
+    # walk are taken from started.
+    resolved = []
+    for node in nodes:
+        if node is None:
+            continue
         if _is_active_element(node):
-            # in tag position
-            return _expand_nodes(node_tag(*node_content, **node_attrs))  # type: ignore
+            queue = started.get(id(node))
+            if queue:
+                node = queue.popleft()
+            else:
+                node = asyncio.ensure_future(_aresolve_node(node))
+                tasks.append(node)
+        resolved.append(node)
+    return resolved
+
+
+def _start_nested(nodes, tasks: list, started: dict) -> None:
+    # Starts the tasks of the active nodes nested in the static part of the
+    # nodes so they don't wait until the walk reaches their parent. The
+    # tasks are queued in document order under the id of the active node.
+    stack = [iter(nodes)]
+    while stack:
+        for node in stack[-1]:
+            if _is_active_element(node):
+                task = asyncio.ensure_future(_aresolve_node(node))
+                tasks.append(task)
+                started.setdefault(id(node), collections.deque()).append(task)
+                continue
+            if not isinstance(node, list | tuple) or is_special_node(node):
+                continue
+            stack.append(iter(content(node) if is_element(node) else node))
+            break
         else:
-            mu = [node_tag]
-            if len(node_attrs) > 0:
-                mu.append(node_attrs)  # type: ignore
-            mu.extend([_expand_nodes(child) for child in node_content])  # type: ignore
-            return mu
-    elif isinstance(node, (list, tuple)):
-        mu = []
-        for child in node:
-            if child is not None:
-                mu.append(_expand_nodes(child))
-        return mu
-    elif _is_active_node(node):
-        # not in tag position
-        return node()
-    else:
-        return node
+            stack.pop()
+
+
+async def _await_nodes(nodes: list):
+    # yields _PENDING if it has to wait for tasks that aren't done
+    pending = [x for x in nodes if isinstance(x, asyncio.Future) and not x.done()]
+    if pending:
+        yield _PENDING
+        await asyncio.gather(*pending)
+
+
+def _results(nodes: list) -> list:
+    # the nodes with the tasks replaced by their results
+    return [x.result() if isinstance(x, asyncio.Future) else x for x in nodes]
+
+
+def _resolve_nodes(nodes) -> list:
+    """Expand the active nodes in a list of nodes one level deep."""
+    return [_resolve_node(node) for node in nodes if node is not None]
+
+
+def _is_null(node) -> bool:
+    return node is None or (type(node) is _Expanded and node.node is None)
+
+
+def _unwrap(node):
+    return node.node if type(node) is _Expanded else node
+
+
+def _expand_resolved(nodes: list) -> list:
+    return [
+        node.node if type(node) is _Expanded else _expand_nodes(node) for node in nodes
+    ]
+
+
+def _expand_nodes(node):
+    # Uses an explicit stack of (children, expanded list) frames instead of
+    # recursion so the nesting depth is not limited by the Python stack.
+    root = []
+    stack = [(iter((node,)), root)]
+    while stack:
+        children, mu = stack[-1]
+        for child in children:
+            if child is None:
+                continue
+            # fast path for text and elements with a string tag
+            child_type = type(child)
+            if child_type is str:
+                mu.append(child)
+                continue
+            if child_type is list or child_type is tuple:
+                name = child[0] if child else None
+                if type(name) is str:
+                    size = len(child)
+                    start = 2 if size > 1 and isinstance(child[1], dict) else 1
+                    expanded = [name, child[1]] if start == 2 and child[1] else [name]
+                    mu.append(expanded)
+                    stack.append((itertools.islice(child, start, None), expanded))
+                    break
+            while is_element(child) and _is_active_node(child[0]):
+                # in tag position
+                if _is_pure(child[0]):
+                    child = _expand_pure(child)
+                    break
+                child = child[0](*content(child), **attrs(child))
+            if type(child) is _Expanded:
+                mu.append(
+                    child.node if child.key is None else _copy_expanded(child.node)
+                )
+            elif is_element(child):
+                expanded = [child[0]]
+                node_attrs = attrs(child)
+                if len(node_attrs) > 0:
+                    expanded.append(node_attrs)
+                mu.append(expanded)
+                stack.append((iter(content(child)), expanded))
+                break
+            elif isinstance(child, (list, tuple)):
+                expanded = []
+                mu.append(expanded)
+                stack.append((iter(child), expanded))
+                break
+            elif _is_active_node(child):
+                # not in tag position
+                if _is_pure(child):
+                    child = _expand_pure(child)
+                    mu.append(
+                        child.node if child.key is None else _copy_expanded(child.node)
+                    )
+                else:
+                    mu.append(child())
+            else:
+                mu.append(child)
+        else:
+            stack.pop()
+    return root[0] if root else None
 
 
 def expand(*nodes):
@@ -456,41 +1807,611 @@ def expand(*nodes):
         return _expand_nodes(nodes)
 
 
-def _markup(*nodes, serializer=serializers["xml"]):
+def _with_indent(serializer: XmlSerializer, indent) -> XmlSerializer:
+    # a copy of the serializer that indents the markup
+    if indent is None:
+        return serializer
+    serializer = copy.copy(serializer)
+    serializer.indent = indent
+    return serializer
+
+
+def _with_encoding(serializer: XmlSerializer, encoding: str) -> XmlSerializer:
+    # a copy of the serializer that raises UnicodeEncodeError for characters
+    # that can't be encoded in places where character references don't work
+    if codecs.lookup(encoding).name.startswith("utf"):
+        return serializer
+    serializer = copy.copy(serializer)
+    serializer._encoding = encoding
+    return serializer
+
+
+def _markup(
+    *nodes, serializer=serializers["xml"], encoding=None, workers=None, indent=None
+):
     """Convert Mu datastructure(s) into a markup string.
 
     Args:
         *nodes: One or more Mu nodes to convert
+        encoding: When given the markup is returned as bytes in this encoding
+        workers: When given large documents are rendered by this many
+            processes (see `render_parallel`)
+        indent: When given elements with element content are indented by
+            this number of spaces (or this string), indented markup is
+            always rendered serially
 
     Returns:
-        A string containing the markup representation
+        A string (or bytes) containing the markup representation
 
     Example:
         >>> markup(["div", {"class": "content"}, "Hello"])
         '<div class="content">Hello</div>'
 
     """
-    return serializer.write(*nodes)
+    serializer = _with_indent(serializer, indent)
+    if workers is not None:
+        if encoding is not None:
+            serializer = _with_encoding(serializer, encoding)
+        markup = _render_parallel(
+            serializer, expand(*nodes), workers, 1, PARALLEL_THRESHOLD, "process"
+        )
+        return (
+            markup if encoding is None else markup.encode(encoding, "xmlcharrefreplace")
+        )
+    if encoding is None:
+        return serializer.write(*nodes)
+    return serializer.write_bytes(*nodes, encoding=encoding)
+
+
+def xml(*nodes, encoding=None, workers=None, indent=None):
+    """Render Mu as an XML formatted string (or bytes if encoding is given)."""
+    return _markup(*nodes, encoding=encoding, workers=workers, indent=indent)
+
+
+def html(*nodes, encoding=None, workers=None, indent=None):
+    """Render Mu as an HTML formatted string (or bytes if encoding is given)."""
+    return _markup(
+        *nodes,
+        serializer=serializers["html"],
+        encoding=encoding,
+        workers=workers,
+        indent=indent,
+    )
 
 
-def xml(*nodes):
-    """Render Mu as an XML formatted string."""
-    return _markup(*nodes)
+def xhtml(*nodes, encoding=None, workers=None, indent=None):
+    """Render Mu as an XHTML formatted string (or bytes if encoding is given)."""
+    return _markup(
+        *nodes,
+        serializer=serializers["xhtml"],
+        encoding=encoding,
+        workers=workers,
+        indent=indent,
+    )
 
 
-def html(*nodes):
-    """Render Mu as an HTML formatted string."""
-    return _markup(*nodes, serializer=serializers["html"])
+def sgml(*nodes, encoding=None, workers=None, indent=None):
+    """Render Mu as an SGML formatted string (or bytes if encoding is given)."""
+    return _markup(
+        *nodes,
+        serializer=serializers["sgml"],
+        encoding=encoding,
+        workers=workers,
+        indent=indent,
+    )
 
 
-def xhtml(*nodes):
-    """Render Mu as an XHTML formatted string."""
-    return _markup(*nodes, serializer=serializers["xhtml"])
+def compile(*nodes, method="xml") -> Template:
+    """Compile Mu into a template that renders the static parts only once.
 
+    Example:
+        >>> page = compile(["p", "Hello, ", Slot("name"), "!"], method="html")
+        >>> page.render(name="World")
+        '<p>Hello, World!</p>'
+
+    """
+    return serializers[method].compile(*nodes)
+
+
+def dump(
+    node, fp, method="xml", encoding="utf-8", buffer_size=BUFFER_SIZE, indent=None
+):
+    """Render Mu as markup directly into a text or binary file object.
+
+    Args:
+        node: The Mu node to render
+        fp: A file-like object with a `write()` method
+        method: Name of the serializer to use (xml, html, xhtml or sgml)
+        encoding: Encoding used when `fp` is a binary file object
+        buffer_size: Number of characters to collect before writing to `fp`
+        indent: Indent elements with element content (see `xml`)
+
+    Example:
+        >>> with open("page.html", "wb") as fp:
+        ...     dump(["p", "Hello"], fp, method="html")
+
+    """
+    _with_indent(serializers[method], indent).dump(
+        fp, node, encoding=encoding, buffer_size=buffer_size
+    )
+
+
+class _Chunk:
+    # an expanded subtree that is serialized by a worker
+    def __init__(self, node) -> None:
+        self.node = node
+
+
+_executors = {}
+
+
+def _worker_config(serializer: XmlSerializer) -> tuple:
+    # The class and settings of the serializer for the workers. The name
+    # caches are left out, workers use the caches of their own process.
+    state = {
+        name: value
+        for name, value in vars(serializer).items()
+        if name not in ("_names", "_qnames")
+    }
+    return type(serializer), state
+
+
+def _worker_serializer(config: tuple) -> XmlSerializer:
+    serializer_class, state = config
+    serializer = serializer_class()
+    vars(serializer).update(state)
+    return serializer
+
+
+def _render_batch(config: tuple, batch: list) -> str:
+    # runs in a worker: batch holds markup and expanded subtrees (lists)
+    serializer = _worker_serializer(config)
+    return "".join(
+        [
+            item if type(item) is str else "".join(serializer._iter_node(item))
+            for item in batch
+        ]
+    )
+
+
+def _get_executor(executor, workers: int | None) -> futures.Executor:
+    if isinstance(executor, futures.Executor):
+        return executor
+    key = (executor, workers)
+    if key not in _executors:
+        if executor == "process":
+            _executors[key] = futures.ProcessPoolExecutor(workers)
+        elif executor == "thread":
+            _executors[key] = futures.ThreadPoolExecutor(workers)
+        else:
+            raise ValueError(f"Unknown executor {executor!r}.")
+    return _executors[key]
+
+
+def _has_nodes(node, count: int) -> bool:
+    # are there at least count nodes? stops counting when there are
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count -= 1
+        if count <= 0:
+            return True
+        if isinstance(node, list | tuple):
+            stack.extend(node)
+    return False
 
-def sgml(*nodes):
-    """Render Mu as an SGML formatted string."""
-    return _markup(*nodes, serializer=serializers["sgml"])
+
+def _render_parallel(serializer, node, workers, depth, threshold, executor):
+    if serializer.indent is not None:
+        # indented markup depends on the depth of the subtrees
+        return "".join(serializer._iter_indented(node))
+    if workers == 1 or not _has_nodes(node, threshold):
+        return "".join(serializer._iter_node(node))
+    segments = []
+    serializer._split_node(node, depth, segments)
+    pool = _get_executor(executor, workers)
+    batch_size = max(1, len(segments) // ((workers or os.cpu_count() or 1) * 4))
+    config = _worker_config(serializer)
+    tasks = [
+        pool.submit(
+            _render_batch,
+            config,
+            [
+                segment.node if type(segment) is _Chunk else segment
+                for segment in segments[i : i + batch_size]
+            ],
+        )
+        for i in range(0, len(segments), batch_size)
+    ]
+    return "".join([task.result() for task in tasks])
+
+
+def render_parallel(
+    *nodes,
+    method="xml",
+    workers=None,
+    depth=1,
+    threshold=PARALLEL_THRESHOLD,
+    executor="process",
+):
+    """Render Mu as markup, serializing independent subtrees in parallel.
+
+    The document is expanded and split into the markup above `depth` and
+    the subtrees at `depth` (the children of the root element by default).
+    The subtrees are serialized in batches by a pool of workers and joined
+    in document order. Documents with fewer than `threshold` nodes are
+    rendered serially.
+
+    Args:
+        *nodes: One or more Mu nodes to convert
+        method: Name of the serializer to use (xml, html, xhtml or sgml)
+        workers: Number of workers (default: number of CPUs)
+        depth: Depth at which the document is split
+        threshold: Minimum number of nodes for parallel rendering
+        executor: "process", "thread" (for free-threaded Python builds) or
+            a `concurrent.futures.Executor`
+
+    Example:
+        >>> render_parallel(["ul", [["li", i] for i in (1, 2, 3)]], threshold=0)
+        '<ul><li>1</li><li>2</li><li>3</li></ul>'
+
+    """
+    return _render_parallel(
+        serializers[method], expand(*nodes), workers, depth, threshold, executor
+    )
+
+
+def _render_docs(config: tuple, docs: list) -> list[str]:
+    # runs in a worker: docs are already expanded
+    iter_node = _worker_serializer(config)._iter_node
+    return ["".join(iter_node(doc)) for doc in docs]
+
+
+def _iter_many(serializer, docs):
+    iter_node = serializer._iter_node
+    join = "".join
+    for doc in docs:
+        yield join(iter_node(doc, True))
+
+
+def _iter_many_parallel(serializer, docs, workers, batch_size, executor):
+    pool = _get_executor(executor, workers)
+    config = _worker_config(serializer)
+    docs = iter(docs)
+    tasks = []
+    while True:
+        batch = [expand(doc) for _, doc in zip(range(batch_size), docs)]
+        if batch:
+            tasks.append(pool.submit(_render_docs, config, batch))
+        # keep a few batches in flight and hand out finished ones in order
+        while tasks and (len(tasks) > (workers or os.cpu_count() or 1) or not batch):
+            yield from tasks.pop(0).result()
+        if not batch:
+            break
+
+
+def render_many(
+    docs,
+    method="html",
+    lazy=False,
+    workers=None,
+    batch_size=256,
+    executor="process",
+):
+    """Render an iterable of documents, each to its own markup string.
+
+    Unlike calling `html()` for each document the serializer methods are
+    looked up once and the documents are expanded while they are written
+    instead of being copied first. Name validation results are cached
+    across all documents.
+
+    Args:
+        docs: Iterable of Mu documents
+        method: Name of the serializer to use (xml, html, xhtml or sgml)
+        lazy: Return a generator instead of a list
+        workers: When given the documents are rendered in batches of
+            `batch_size` by this many workers
+        batch_size: Number of documents sent to a worker at once
+        executor: "process", "thread" or a `concurrent.futures.Executor`
+
+    Example:
+        >>> render_many([["p", 1], ["p", 2]])
+        ['<p>1</p>', '<p>2</p>']
+
+    """
+    serializer = serializers[method]
+    if workers is None:
+        markup = _iter_many(serializer, docs)
+    else:
+        markup = _iter_many_parallel(serializer, docs, workers, batch_size, executor)
+    return markup if lazy else list(markup)
+
+
+class RenderStats:
+    """Counters and timings collected by `profile()`.
+
+    Attributes:
+        nodes: Serialized nodes per type ("element", "$comment", "str", ...)
+        node_calls: Calls per Node class
+        node_time: Seconds spent in the `__call__` of each Node class
+        expand_time: Seconds spent in `expand()`
+        serialize_time: Seconds spent serializing expanded nodes
+        names_validated: Number of tag and attribute names validated
+        name_time: Seconds spent validating names
+        escapes: Number of escaped text and attribute values
+        escape_time: Seconds spent escaping
+        chars_emitted: Number of characters of markup produced
+        bytes_emitted: Number of bytes of encoded markup produced
+        elapsed: Seconds spent in the profiled block
+    """
+
+    def __init__(self) -> None:
+        self.nodes = collections.Counter()
+        self.node_calls = collections.Counter()
+        self.node_time = collections.Counter()
+        self.expand_time = 0.0
+        self.serialize_time = 0.0
+        self.names_validated = 0
+        self.name_time = 0.0
+        self.escapes = 0
+        self.escape_time = 0.0
+        self.chars_emitted = 0
+        self.bytes_emitted = 0
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in vars(self).items())
+        return f"RenderStats({fields})"
+
+
+_profiling = False
+
+
+@contextlib.contextmanager
+def profile(callback: Callable | None = None):
+    """Collect statistics of the rendering done inside the with block.
+
+    While the block runs the serializer, `expand()`, the escape functions
+    and the `__call__` of all Node classes are replaced by counting and
+    timing wrappers. They are restored afterwards so nothing is measured,
+    and nothing is slowed down, outside of a profile block. The wrappers
+    are global so renders in other threads are measured as well.
+
+    Args:
+        callback: Called with the `RenderStats` when the block exits
+
+    Example:
+        >>> with profile() as stats:
+        ...     _ = xml(["p", {"id": 1}, "Hello"])
+        >>> stats.nodes
+        Counter({'element': 1, 'str': 1})
+    """
+    global _profiling
+    if _profiling:
+        raise RuntimeError("A profile is already active.")
+    stats = RenderStats()
+    patches = _profile_patches(stats)
+    originals = [(obj, name, obj.__dict__[name]) for obj, name, _ in patches]
+    for obj, name, wrapper in patches:
+        setattr(obj, name, wrapper)
+    _profiling = True
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.elapsed = time.perf_counter() - start
+        for obj, name, original in originals:
+            setattr(obj, name, original)
+        _profiling = False
+        if callback is not None:
+            callback(stats)
+
+
+def _profile_patches(stats: RenderStats) -> list:
+    # (object, attribute, wrapper) for everything that is measured
+    perf_counter = time.perf_counter
+    patches = []
+    module = sys.modules[__name__]
+    depth = [0]
+
+    def patch(obj, name):
+        def register(wrapper):
+            patches.append((obj, name, functools.wraps(obj.__dict__[name])(wrapper)))
+            return wrapper
+
+        return register
+
+    def timed_call(call):
+        def wrapper(self, *args, **kwargs):
+            if depth[0] > 0:
+                # super().__call__() of a class that is already timed
+                return call(self, *args, **kwargs)
+            depth[0] += 1
+            start = perf_counter()
+            try:
+                return call(self, *args, **kwargs)
+            finally:
+                depth[0] -= 1
+                name = type(self).__qualname__
+                stats.node_time[name] += perf_counter() - start
+                stats.node_calls[name] += 1
+
+        return functools.wraps(call)(wrapper)
+
+    classes = [Node]
+    while classes:
+        cls = classes.pop()
+        classes.extend(cls.__subclasses__())
+        if "__call__" in cls.__dict__:
+            patches.append((cls, "__call__", timed_call(cls.__dict__["__call__"])))
+
+    expand_ = module.expand
+
+    @patch(module, "expand")
+    def expand(*nodes):
+        start = perf_counter()
+        try:
+            return expand_(*nodes)
+        finally:
+            stats.expand_time += perf_counter() - start
+
+    iter_encoded = module._iter_encoded
+
+    @patch(module, "_iter_encoded")
+    def _iter_encoded(blocks, encoding):
+        for block in iter_encoded(blocks, encoding):
+            stats.bytes_emitted += len(block)
+            yield block
+
+    for name in ["escape_text", "escape_attr"]:
+        escape_ = getattr(util, name)
+
+        def escape(value, escape_=escape_):
+            start = perf_counter()
+            try:
+                return escape_(value)
+            finally:
+                stats.escapes += 1
+                stats.escape_time += perf_counter() - start
+
+        patches.append((util, name, functools.wraps(escape_)(escape)))
+
+    iter_node = XmlSerializer._iter_node
+    serializing = [False]
+
+    @patch(XmlSerializer, "_iter_node")
+    def _iter_node(self, node, fused=False):
+        fragments = iter_node(self, node, fused)
+        if serializing[0]:
+            # nested call, measured by the outer one
+            yield from fragments
+            return
+        while True:
+            # only set while a fragment is produced, the generator may be
+            # left suspended while other markup is rendered
+            serializing[0] = True
+            start = perf_counter()
+            try:
+                fragment = next(fragments)
+            except StopIteration:
+                return
+            finally:
+                serializing[0] = False
+                stats.serialize_time += perf_counter() - start
+            stats.chars_emitted += len(fragment)
+            yield fragment
+
+    start_tag = XmlSerializer._start_tag
+
+    @patch(XmlSerializer, "_start_tag")
+    def _start_tag(self, node, close=False, xhtml=False):
+        stats.nodes["element"] += 1
+        return start_tag(self, node, close, xhtml)
+
+    ser_atomic = XmlSerializer._ser_atomic
+
+    @patch(XmlSerializer, "_ser_atomic")
+    def _ser_atomic(self, node):
+        stats.nodes[type(node).__name__] += 1
+        return ser_atomic(self, node)
+
+    ser_special_node = XmlSerializer._ser_special_node
+
+    @patch(XmlSerializer, "_ser_special_node")
+    def _ser_special_node(self, node):
+        stats.nodes[node[0]] += 1
+        return ser_special_node(self, node)
+
+    is_qname = XmlSerializer._is_qname
+
+    @patch(XmlSerializer, "_is_qname")
+    def _is_qname(self, name):
+        start = perf_counter()
+        try:
+            return is_qname(self, name)
+        finally:
+            stats.names_validated += 1
+            stats.name_time += perf_counter() - start
+
+    return patches
+
+
+def _iter_markup(*nodes, serializer=serializers["xml"], indent=None):
+    """Convert Mu datastructure(s) into markup string fragments.
+
+    Args:
+        *nodes: One or more Mu nodes to convert
+        indent: Indent elements with element content (see `xml`)
+
+    Returns:
+        A generator of strings that, joined, equal the markup representation
+
+    Example:
+        >>> list(_iter_markup(["div", "Hello"]))
+        ['<div>', 'Hello', '</div>']
+
+    """
+    return _with_indent(serializer, indent).iter_write(*nodes)
+
+
+def iter_xml(*nodes, indent=None):
+    """Render Mu as XML formatted string fragments."""
+    return _iter_markup(*nodes, indent=indent)
+
+
+def iter_html(*nodes, indent=None):
+    """Render Mu as HTML formatted string fragments."""
+    return _iter_markup(*nodes, serializer=serializers["html"], indent=indent)
+
+
+def iter_xhtml(*nodes, indent=None):
+    """Render Mu as XHTML formatted string fragments."""
+    return _iter_markup(*nodes, serializer=serializers["xhtml"], indent=indent)
+
+
+def iter_sgml(*nodes, indent=None):
+    """Render Mu as SGML formatted string fragments."""
+    return _iter_markup(*nodes, serializer=serializers["sgml"], indent=indent)
+
+
+async def axml(*nodes):
+    """Render Mu as XML, awaiting awaitables returned by active nodes."""
+    return await serializers["xml"].awrite(*nodes)
+
+
+async def ahtml(*nodes):
+    """Render Mu as HTML, awaiting awaitables returned by active nodes."""
+    return await serializers["html"].awrite(*nodes)
+
+
+async def axhtml(*nodes):
+    """Render Mu as XHTML, awaiting awaitables returned by active nodes."""
+    return await serializers["xhtml"].awrite(*nodes)
+
+
+async def asgml(*nodes):
+    """Render Mu as SGML, awaiting awaitables returned by active nodes."""
+    return await serializers["sgml"].awrite(*nodes)
+
+
+def aiter_xml(*nodes):
+    """Render Mu as XML formatted chunks with an async iterator."""
+    return serializers["xml"].aiter_write(*nodes)
+
+
+def aiter_html(*nodes):
+    """Render Mu as HTML formatted chunks with an async iterator."""
+    return serializers["html"].aiter_write(*nodes)
+
+
+def aiter_xhtml(*nodes):
+    """Render Mu as XHTML formatted chunks with an async iterator."""
+    return serializers["xhtml"].aiter_write(*nodes)
+
+
+def aiter_sgml(*nodes):
+    """Render Mu as SGML formatted chunks with an async iterator."""
+    return serializers["sgml"].aiter_write(*nodes)
 
 
 def _loads_content(nodes):
@@ -506,8 +2427,79 @@ def _loads_boolean(node):
     return False
 
 
+def _loads_object(node):
+    obj = {}
+    i = 0
+    for item in content(node):
+        i += 1
+        if is_element(item):
+            item_key = get_attr("key", item, tag(item))
+            item_value = loads(item)
+        else:
+            item_key = i
+            item_value = loads(item)
+        obj[item_key] = item_value
+    return obj
+
+
+def _loads_array(node):
+    item_type = get_attr("item-type", node)
+    if item_type in PACKED_TYPES:
+        # packed items are decoded in bulk
+        return list(map(PACKED_TYPES[item_type], "".join(content(node)).split()))
+    arr = []
+    for item in content(node):
+        arr.append(loads(item))
+    return arr
+
+
+def _loads_string(node):
+    return _loads_content(content(node))
+
+
+def _loads_null(node):
+    return None
+
+
+def _loads_number(cast: type) -> Callable:
+    # the value is the content, numbers that are 0 have no content
+    def decode(node):
+        items = content(node)
+        return cast(items[0]) if items else cast()
+
+    return decode
+
+
+PACKED_TYPES = {"integer": int, "float": float}
+
+_decoders = {
+    "object": _loads_object,
+    "array": _loads_array,
+    "string": _loads_string,
+    "boolean": _loads_boolean,
+    "null": _loads_null,
+    "integer": _loads_number(int),
+    "float": _loads_number(float),
+    "complex": _loads_number(complex),
+}
+
+
+def register_decoder(name: str, decoder: Callable) -> None:
+    """Use `decoder(node)` in `loads()` for elements with `as` set to `name`.
+
+    Example:
+        >>> register_decoder("date", lambda node: date.fromisoformat(node[2]))
+
+    """
+    _decoders[name] = decoder
+
+
 def loads(node):
-    """Create a Python value from a Mu value."""
+    """Create a Python value from a Mu value.
+
+    Elements are decoded by the decoder registered for their `as` attribute
+    (see `register_decoder`), elements with an unknown `as` become None.
+    """
     typ = type(node)
     if typ in ATOMIC_VALUE or node is None:
         return node
@@ -516,34 +2508,10 @@ def loads(node):
         pass
     elif typ is list:
         if is_element(node):
-            node_typ = get_attr("as", node, "string")
-            if node_typ == "object":
-                obj = {}
-                i = 0
-                for item in content(node):
-                    i += 1
-                    if is_element(item):
-                        item_key = get_attr("key", item, tag(item))
-                        item_value = loads(item)
-                    else:
-                        item_key = i
-                        item_value = loads(item)
-                    obj[item_key] = item_value
-                return obj
-            if node_typ == "array":
-                arr = []
-                for item in content(node):
-                    arr.append(loads(item))
-                return arr
-            if node_typ == "string":
-                return _loads_content(content(node))
-            if node_typ == "boolean":
-                return _loads_boolean(node)
-            if node_typ == "null":
-                return None
-            if node_typ == "number":
+            decoder = _decoders.get(get_attr("as", node, "string"))
+            if decoder is None:
                 return None
-            return None
+            return decoder(node)
 
         li = []
         for i in node:
@@ -553,78 +2521,462 @@ def loads(node):
         raise ValueError(f"Unknown node {node}")
 
 
-def _dumps_none(key="_"):
-    return [key, {"as": "null"}]
+def iterloads(events, depth: int = 1):
+    """Create Python values from a stream of start, data and end events.
+
+    The events come from `iterdumps` or from parsing XML with `iterevents`.
+    Like `iterparse` the value of each node at `depth` is yielded as soon
+    as its end event is seen and the node isn't kept. The root node is at
+    depth 0, so by default the items of a top level array or object are
+    yielded one by one, also when the array is packed. Values are the same
+    as `loads()` of the nodes.
+
+    Example:
+        >>> for row in iterloads(iterevents(open("rows.xml", "rb"), strip=True)):
+        ...     print(row)
+
+    """
+    stack = [[]]
+    for event in events:
+        kind = event[0]
+        if kind == "start":
+            node = [event[1], event[2]] if event[2] else [event[1]]
+            if len(stack) - 1 != depth:
+                stack[-1].append(node)
+            stack.append(node)
+        elif kind == "data":
+            if len(stack) - 1 != depth or _is_packed(stack[-1]):
+                stack[-1].append(event[1])
+        else:
+            node = stack.pop()
+            if len(stack) - 1 == depth:
+                yield loads(node)
+            elif len(stack) == depth and _is_packed(node):
+                # the items at depth are packed into the content of the array
+                yield from _loads_array(node)
+
+
+def _is_packed(node) -> bool:
+    # arrays of numbers dumped as a single string (see PACKED_ARRAY_THRESHOLD)
+    return (
+        is_element(node)
+        and get_attr("as", node) == "array"
+        and get_attr("item-type", node) in PACKED_TYPES
+    )
+
+
+class _SharedAttrs(dict):
+    """Read-only attributes dict shared by the nodes of `dumps(shared_attrs=True)`.
+
+    It is a dict so `attrs()`, `get_attr()` and the serializers work as
+    usual. Copies (and pickled or deep copied trees) get plain dicts.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(
+            "Attributes created by dumps(value, shared_attrs=True) are shared "
+            "and read-only, use dumps(value) to get own dicts."
+        )
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+_NULL_ATTRS = _SharedAttrs({"as": "null"})
+_INTEGER_ATTRS = _SharedAttrs({"as": "integer"})
+_FLOAT_ATTRS = _SharedAttrs({"as": "float"})
+_COMPLEX_ATTRS = _SharedAttrs({"as": "complex"})
+_TRUE_ATTRS = _SharedAttrs({"as": "boolean", "value": "true()"})
+_FALSE_ATTRS = _SharedAttrs({"as": "boolean", "value": "false()"})
+_ARRAY_ATTRS = _SharedAttrs({"as": "array"})
+_OBJECT_ATTRS = _SharedAttrs({"as": "object"})
+_MU_ATTRS = _SharedAttrs({"as": "mu"})
+_PACKED_ATTRS = {
+    item_type: _SharedAttrs({"as": "array", "item-type": item_type})
+    for item_type in ("integer", "float")
+}
+
+
+# True while dumps(shared_attrs=True) runs, the encoders then use the shared
+# attribute dicts instead of new ones
+_sharing_attrs = contextvars.ContextVar("sharing_attrs", default=False)
+
+
+def _dumps_none(value=None, key="_"):
+    return [key, _NULL_ATTRS if _sharing_attrs.get() else {"as": "null"}]
 
 
 def _dumps_string(value, key="_"):
     return [key, value]
 
 
+def _packed_type(values) -> str | None:
+    # The item type of arrays of ints or floats that are dumped packed into a
+    # single string, unless int or float have an encoder of their own.
+    if len(values) < PACKED_ARRAY_THRESHOLD:
+        return None
+    types = set(map(type, values))
+    if types == {int} and _encoders[int] is _dumps_integer:
+        return "integer"
+    if types == {float} and _encoders[float] is _dumps_float:
+        return "float"
+    return None
+
+
+def _dumps_packed(values, item_type: str, key="_"):
+    return [
+        key,
+        (
+            _PACKED_ATTRS[item_type]
+            if _sharing_attrs.get()
+            else {"as": "array", "item-type": item_type}
+        ),
+        " ".join(map(str, values)),
+    ]
+
+
 def _dumps_array(values, key="_"):
-    arr = [key, {"as": "array"}]
+    item_type = _packed_type(values)
+    if item_type is not None:
+        return _dumps_packed(values, item_type, key)
+    arr = [key, _ARRAY_ATTRS if _sharing_attrs.get() else {"as": "array"}]
     for value in values:
-        arr.append(dumps(value, "_"))
+        arr.append(_dumps(value, "_"))
     return arr
 
 
 def _dumps_map(value, key="_"):
-    obj = [key, {"as": "object"}]
+    obj = [key, _OBJECT_ATTRS if _sharing_attrs.get() else {"as": "object"}]
     for key in value.keys():
-        obj.append(dumps(value[key], key))
+        obj.append(_dumps(value[key], key))
     return obj
 
 
 def _dumps_integer(value, key="_"):
-    return [key, {"as": "integer"}, value]
+    return [key, _INTEGER_ATTRS if _sharing_attrs.get() else {"as": "integer"}, value]
 
 
 def _dumps_float(value, key="_"):
-    return [key, {"as": "float"}, value]
+    return [key, _FLOAT_ATTRS if _sharing_attrs.get() else {"as": "float"}, value]
 
 
 def _dumps_complex(value, key="_"):
-    return [key, {"as": "complex"}, value]
+    return [key, _COMPLEX_ATTRS if _sharing_attrs.get() else {"as": "complex"}, value]
 
 
 def _dumps_boolean(value, key="_"):
+    if _sharing_attrs.get():
+        return [key, _TRUE_ATTRS if value is True else _FALSE_ATTRS]
     return [key, {"as": "boolean", "value": "true()" if value is True else "false()"}]
 
 
 def _dumps_object(value, key="_"):
     if hasattr(value, "mu") and callable(value.mu):
-        return [key, {"as": "mu"}, value.mu()]
-    return [key, {"as": "null"}]
+        return [key, _MU_ATTRS if _sharing_attrs.get() else {"as": "mu"}, value.mu()]
+    return [key, _NULL_ATTRS if _sharing_attrs.get() else {"as": "null"}]
 
 
 def _dumps_fun(value, key="_"):
     v = value()
     if v is None:
-        return [key, {"as": "null"}]
-    return [key, {"as": "mu"}, v]
+        return [key, _NULL_ATTRS if _sharing_attrs.get() else {"as": "null"}]
+    return [key, _MU_ATTRS if _sharing_attrs.get() else {"as": "mu"}, v]
+
+
+def _dumps_dataclass(value, key="_"):
+    obj = [key, _OBJECT_ATTRS if _sharing_attrs.get() else {"as": "object"}]
+    for field in dataclasses.fields(value):
+        obj.append(_dumps(getattr(value, field.name), field.name))
+    return obj
+
+
+def _dumps_buffer(value, key="_"):
+    # The items of buffers (array.array, memoryview, NumPy arrays) are read
+    # with a single tolist() and encoded with the encoder of their format.
+    # Zero-dimensional buffers (e.g. NumPy scalars) hold a single item and
+    # character buffers are not dumped.
+    view = memoryview(value)
+    if view.format == "c":
+        return _dumps_object(value, key)
+    try:
+        items = view.tolist()
+    except NotImplementedError:
+        return _dumps_object(value, key)
+    if view.ndim == 0:
+        if view.format in BUFFER_FORMATS:
+            return BUFFER_FORMATS[view.format](items, key)
+        return _dumps(items, key)
+    if view.ndim != 1 or view.format not in BUFFER_FORMATS:
+        return _dumps_array(items, key)
+    item_type = _packed_type(items)
+    if item_type is not None:
+        return _dumps_packed(items, item_type, key)
+    encode = BUFFER_FORMATS[view.format]
+    return [
+        key,
+        _ARRAY_ATTRS if _sharing_attrs.get() else {"as": "array"},
+        *[encode(item) for item in items],
+    ]
+
+
+BUFFER_FORMATS = {
+    **dict.fromkeys("bBhHiIlLqQnN", _dumps_integer),
+    **dict.fromkeys("efd", _dumps_float),
+    "?": _dumps_boolean,
+}
+
+_DEFAULT_ENCODERS = {
+    type(None): _dumps_none,
+    int: _dumps_integer,
+    float: _dumps_float,
+    complex: _dumps_complex,
+    str: _dumps_string,
+    bool: _dumps_boolean,
+    list: _dumps_array,
+    tuple: _dumps_array,
+    dict: _dumps_map,
+}
+_encoders = dict(_DEFAULT_ENCODERS)
+_encoder_cache = {}
+
+
+def register_encoder(typ: type, encoder: Callable) -> None:
+    """Use `encoder(value, key)` in `dumps()` for values of type `typ`.
 
+    The encoder returns the Mu node for the value, it is also used for
+    subclasses of `typ` that don't have an encoder of their own.
 
-def dumps(value, key="_"):
-    """Create a Mu value from a Python value."""
+    Example:
+        >>> register_encoder(date, lambda v, key: [key, {"as": "date"}, v.isoformat()])
+
+    """
+    _encoders[typ] = encoder
+    _encoder_cache.clear()
+
+
+def _find_encoder(value) -> Callable:
+    # The encoder of the type or of the nearest base class in the MRO. Objects
+    # with a mu() method and functions keep their own encoding.
     typ = type(value)
-    if value is None:
-        return _dumps_none(key)
-    if typ is int:
-        return _dumps_integer(value, key)
-    if typ is float:
-        return _dumps_float(value, key)
-    if typ is complex:
-        return _dumps_complex(value, key)
-    if typ is str:
-        return _dumps_string(value, key)
-    if typ is bool:
-        return _dumps_boolean(value, key)
-    if typ is list or typ is tuple:
-        return _dumps_array(value, key)
-    if typ is dict:
-        return _dumps_map(value, key)
+    if typ in _encoders:
+        return _encoders[typ]
+    if callable(getattr(typ, "mu", None)):
+        return _dumps_object
+    for base in typ.__mro__[1:]:
+        if base in _encoders:
+            return _encoders[base]
+    if dataclasses.is_dataclass(typ):
+        return _dumps_dataclass
+    if isinstance(value, (bytes, bytearray)):
+        return _dumps_object
+    try:
+        memoryview(value)
+        return _dumps_buffer
+    except TypeError:
+        pass
     if callable(value):
-        return _dumps_fun(value, key)
-    if isinstance(value, object):
-        return _dumps_object(value, key)
-    return value
+        return _dumps_fun
+    return _dumps_object
+
+
+def _json_types() -> set:
+    # the types still dumped by the default encoder
+    return {
+        typ for typ, encoder in _DEFAULT_ENCODERS.items() if _encoders[typ] is encoder
+    }
+
+
+def dumps(value, key="_", shared_attrs: bool = False):
+    """Create a Mu value from a Python value.
+
+    The value is encoded by the encoder registered for its type or for the
+    nearest base class (see `register_encoder`). Dataclasses are dumped as
+    objects and buffers (`array.array`, `memoryview`) as arrays, except for
+    `bytes` and `bytearray`. Other objects are dumped with their `mu()`
+    method, functions are called.
+
+    With `shared_attrs=True` the elements share read-only attribute dicts
+    (e.g. all integers have the same `{"as": "integer"}`), which takes less
+    memory and time for large values.
+    """
+    token = _sharing_attrs.set(shared_attrs)
+    try:
+        return _dumps(value, key)
+    finally:
+        _sharing_attrs.reset(token)
+
+
+def _dumps(value, key="_"):
+    # dumps() for the values in containers, keeps the attrs sharing mode
+    typ = type(value)
+    encoder = _encoder_cache.get(typ)
+    if encoder is None:
+        encoder = _encoder_cache[typ] = _find_encoder(value)
+    return encoder(value, key)
+
+
+def _iter_mu_events(node):
+    # start, data and end events of an expanded Mu node
+    if is_element(node):
+        yield ("start", node[0], attrs(node))
+        for child in content(node):
+            if isinstance(child, tuple):
+                for item in child:
+                    yield from _iter_mu_events(item)
+            else:
+                yield from _iter_mu_events(child)
+        yield ("end", node[0])
+    elif _is_sequence(node):
+        for child in node:
+            if child is not None:
+                yield from _iter_mu_events(child)
+    elif node is not None:
+        yield ("data", node)
+
+
+def iterdumps(value, key="_", method: str | None = None):
+    """Create Mu events (or markup) from a Python value while walking it.
+
+    Yields the start, data and end events (see `iterevents`) of the Mu that
+    `dumps(value, key)` creates. Lists, tuples and dicts are walked lazily
+    and generators and other iterators are dumped as arrays, so memory use
+    depends on the nesting depth of the value and not on its size. With
+    `method` (xml, html, xhtml or sgml) markup chunks are yielded instead.
+
+    Example:
+        >>> rows = ({"id": i} for i in range(5_000_000))
+        >>> with open("rows.xml", "w") as fp:
+        ...     fp.writelines(iterdumps(rows, method="xml"))
+
+    """
+    events = _iter_dumps_events(value, key)
+    if method is None:
+        return events
+    return serializers[method].iter_events(events)
+
+
+def _iter_dumps_events(value, key):
+    # Walks the containers with a stack of (key, value) iterators, the other
+    # values are dumped with dumps().
+    json_types = _json_types()
+    stack = [(iter(((key, value),)), None)]
+    while stack:
+        items, end = stack[-1]
+        for key, value in items:
+            typ = type(value)
+            if typ not in json_types and typ in _encoders:
+                yield from _iter_mu_events(expand(dumps(value, key)))
+                continue
+            item_type = _packed_type(value) if typ is list or typ is tuple else None
+            if item_type is not None:
+                node = _dumps_packed(value, item_type, key)
+                yield ("start", key, node[1])
+                yield ("data", node[2])
+                yield ("end", key)
+                continue
+            if typ is list or typ is tuple or isinstance(value, Iterator):
+                yield ("start", key, {"as": "array"})
+                stack.append((zip(itertools.repeat("_"), value), ("end", key)))
+                break
+            if typ is dict:
+                yield ("start", key, {"as": "object"})
+                stack.append((iter(value.items()), ("end", key)))
+                break
+            node = dumps(value, key)
+            if typ in json_types and type(key) is str:
+                yield ("start", key, attrs(node))
+                for item in content(node):
+                    yield ("data", item)
+                yield ("end", key)
+            else:
+                # the Mu of objects and functions may contain active nodes
+                yield from _iter_mu_events(expand(node))
+        else:
+            stack.pop()
+            if end is not None:
+                yield end
+
+
+def dumps_xml(value, fp=None, key="_", encoding="utf-8", buffer_size=BUFFER_SIZE):
+    """Render a Python value as the XML markup of `dumps(value, key)`.
+
+    The markup is written in a single pass over the value without building
+    the Mu nodes and attribute dicts of `dumps()`, the result is the same as
+    `xml(dumps(value, key))`. When `fp` is given the markup is written to
+    this text or binary file object (see `dump`) and None is returned.
+
+    Example:
+        >>> dumps_xml({"id": 1, "tags": ["a"]})
+        '<_ as="object"><id as="integer">1</id><tags as="array"><_>a</_></tags></_>'
+
+    """
+    if fp is None:
+        return "".join(_iter_dumps_xml(value, key, serializers["xml"]))
+    if _is_binary_file(fp):
+        serializer = _with_encoding(serializers["xml"], encoding)
+        chunks = _iter_dumps_xml(value, key, serializer)
+        blocks = _iter_encoded(_iter_blocks(chunks, buffer_size), encoding)
+    else:
+        blocks = _iter_blocks(
+            _iter_dumps_xml(value, key, serializers["xml"]), buffer_size
+        )
+    for block in blocks:
+        fp.write(block)
+
+
+def _iter_dumps_xml(value, key, serializer: XmlSerializer):
+    # The stack walk of _iter_dumps_events writing the markup of the nodes
+    # dumps() would create. Values that aren't JSON-like and keys that need
+    # a transform or aren't valid names go through dumps() and the serializer.
+    escape = util.escape_text
+    is_qname = serializer._is_qname
+    json_types = _json_types()
+    stack = [(iter(((key, value),)), None)]
+    while stack:
+        items, close_tag = stack[-1]
+        for key, value in items:
+            typ = type(value)
+            if (
+                typ not in json_types
+                or type(key) is not str
+                or "#" in key
+                or "." in key
+                or not is_qname(key)
+            ):
+                yield from serializer._iter_node(expand(_dumps(value, key)))
+            elif typ is str:
+                yield f"<{key}>{escape(value)}</{key}>"
+            elif typ is int:
+                yield f'<{key} as="integer">{escape(value) if value else ""}</{key}>'
+            elif typ is float:
+                yield f'<{key} as="float">{escape(value) if value else ""}</{key}>'
+            elif value is None:
+                yield f'<{key} as="null"/>'
+            elif typ is bool:
+                boolean = "true()" if value else "false()"
+                yield f'<{key} as="boolean" value="{boolean}"/>'
+            elif typ is list or typ is tuple or typ is dict:
+                kind = "object" if typ is dict else "array"
+                if len(value) == 0:
+                    yield f'<{key} as="{kind}"/>'
+                    continue
+                item_type = None if typ is dict else _packed_type(value)
+                if item_type is not None:
+                    packed = " ".join(map(str, value))
+                    yield f'<{key} as="array" item-type="{item_type}">{packed}</{key}>'
+                    continue
+                yield f'<{key} as="{kind}">'
+                if typ is dict:
+                    stack.append((iter(value.items()), f"</{key}>"))
+                else:
+                    stack.append((zip(itertools.repeat("_"), value), f"</{key}>"))
+                break
+            else:
+                yield from serializer._iter_node(expand(_dumps(value, key)))
+        else:
+            stack.pop()
+            if close_tag is not None:
+                yield close_tag
@@ -0,0 +1,217 @@
+#
+# Parse XML into Mu data structures.
+#
+#    mu.parse('<foo a="10">bar</foo>') => ['foo', {'a': '10'}, 'bar']
+#
+# Comments, processing instructions and CDATA sections become $comment, $pi
+# and $cdata nodes. Namespace prefixes are kept as part of the names.
+#
+from __future__ import annotations
+
+import os
+from xml.parsers import expat
+
+READ_SIZE = 64 * 1024
+
+
+class _MuBuilder:
+    """Builds Mu nodes from expat callbacks.
+
+    When `depth` is given the nodes at that depth (the root element is at
+    depth 0) are not added to their parent but collected in `completed`
+    once they are complete.
+    """
+
+    def __init__(self, depth: int | None = None, strip: bool = False) -> None:
+        self.nodes = []
+        self.completed = []
+        self._stack = [self.nodes]
+        self._text = []
+        self._cdata = None
+        self._depth = depth
+        self._strip = strip
+
+    def create_parser(self):
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.data
+        parser.CommentHandler = self.comment
+        parser.ProcessingInstructionHandler = self.pi
+        parser.StartCdataSectionHandler = self.start_cdata
+        parser.EndCdataSectionHandler = self.end_cdata
+        return parser
+
+    def start(self, name: str, attributes: dict) -> None:
+        self._flush_text()
+        node = [name, attributes] if attributes else [name]
+        if len(self._stack) - 1 != self._depth:
+            self._stack[-1].append(node)
+        self._stack.append(node)
+
+    def end(self, name: str) -> None:
+        self._flush_text()
+        node = self._stack.pop()
+        if len(self._stack) - 1 == self._depth:
+            self.completed.append(node)
+
+    def data(self, text: str) -> None:
+        if self._cdata is not None:
+            self._cdata.append(text)
+        else:
+            self._text.append(text)
+
+    def comment(self, text: str) -> None:
+        # the serializer adds a space around the comment text
+        if len(text) > 1 and text[0] == " " and text[-1] == " ":
+            text = text[1:-1]
+        self._leaf(["$comment", text])
+
+    def pi(self, target: str, data: str) -> None:
+        self._leaf(["$pi", target, data] if data else ["$pi", target])
+
+    def start_cdata(self) -> None:
+        self._flush_text()
+        self._cdata = []
+
+    def end_cdata(self) -> None:
+        text = "".join(self._cdata)
+        self._cdata = None
+        self._leaf(["$cdata", text])
+
+    def _leaf(self, node: list) -> None:
+        self._flush_text()
+        if len(self._stack) - 1 == self._depth:
+            self.completed.append(node)
+        else:
+            self._stack[-1].append(node)
+
+    def _flush_text(self) -> None:
+        if self._text:
+            text = "".join(self._text)
+            self._text.clear()
+            if self._strip and text.isspace():
+                return
+            if len(self._stack) - 1 != self._depth:
+                self._stack[-1].append(text)
+
+
+class _EventBuilder(_MuBuilder):
+    """Collects start, data and end events from expat callbacks.
+
+    Comments, processing instructions and CDATA sections are reported as
+    the events of their $comment, $pi and $cdata nodes.
+    """
+
+    def __init__(self, strip: bool = False) -> None:
+        super().__init__(strip=strip)
+        self.events = []
+
+    def start(self, name: str, attributes: dict) -> None:
+        self._flush_text()
+        self.events.append(("start", name, attributes))
+
+    def end(self, name: str) -> None:
+        self._flush_text()
+        self.events.append(("end", name))
+
+    def _leaf(self, node: list) -> None:
+        self._flush_text()
+        self.events.append(("start", node[0], {}))
+        self.events.extend(("data", text) for text in node[1:])
+        self.events.append(("end", node[0]))
+
+    def _flush_text(self) -> None:
+        if self._text:
+            text = "".join(self._text)
+            self._text.clear()
+            if self._strip and text.isspace():
+                return
+            self.events.append(("data", text))
+
+
+def _iter_data(source):
+    # yields the source in chunks of str or bytes
+    if isinstance(source, str | bytes | bytearray):
+        for i in range(0, len(source), READ_SIZE):
+            yield source[i : i + READ_SIZE]
+    elif isinstance(source, os.PathLike):
+        with open(source, "rb") as fp:
+            yield from _iter_data(fp)
+    else:
+        while data := source.read(READ_SIZE):
+            yield data
+
+
+def parse(source, strip: bool = False):
+    """Parse XML into a Mu node.
+
+    Args:
+        source: XML text (str or bytes), a path or a file object to read
+        strip: Drop text nodes that only contain whitespace
+
+    Returns:
+        The root element, or a list of nodes when there are comments or
+        processing instructions outside of the root element.
+
+    Example:
+        >>> parse('<p id="1">Hello, <b>World</b>!</p>')
+        ['p', {'id': '1'}, 'Hello, ', ['b', 'World'], '!']
+
+    """
+    builder = _MuBuilder(strip=strip)
+    parser = builder.create_parser()
+    for data in _iter_data(source):
+        parser.Parse(data, False)
+    parser.Parse(b"", True)
+    if len(builder.nodes) == 1:
+        return builder.nodes[0]
+    return builder.nodes
+
+
+def iterparse(source, depth: int = 1, strip: bool = False):
+    """Parse XML incrementally and yield each node at `depth` when complete.
+
+    The root element is at depth 0 so by default the children of the root
+    element are yielded. These nodes are not added to the parent element,
+    so memory use depends on the size of each yielded node and not on the
+    size of the document. Text at `depth` is dropped.
+
+    Example:
+        >>> for entry in iterparse(open("feed.xml", "rb")):
+        ...     print(mu.get_attr("id", entry))
+
+    """
+    builder = _MuBuilder(depth=depth, strip=strip)
+    parser = builder.create_parser()
+    for data in _iter_data(source):
+        parser.Parse(data, False)
+        if builder.completed:
+            completed, builder.completed = builder.completed, []
+            yield from completed
+    parser.Parse(b"", True)
+    yield from builder.completed
+
+
+def iterevents(source, strip: bool = False):
+    """Parse XML incrementally into start, data and end events.
+
+    Yields `("start", name, attrs)`, `("data", text)` and `("end", name)`
+    tuples in document order while the source is read. Building the Mu
+    nodes from the events gives the same nodes as `parse()`.
+
+    Example:
+        >>> list(iterevents("<p>Hi</p>"))
+        [('start', 'p', {}), ('data', 'Hi'), ('end', 'p')]
+
+    """
+    builder = _EventBuilder(strip=strip)
+    parser = builder.create_parser()
+    for data in _iter_data(source):
+        parser.Parse(data, False)
+        if builder.events:
+            events, builder.events = builder.events, []
+            yield from events
+    parser.Parse(b"", True)
+    yield from builder.events
@@ -7,5 +7,50 @@ def escape_html(text):
     return html.escape(str(text))
 
 
+def escape_text(value) -> str:
+    """Escape a value for use as text content.
+
+    Only `&`, `<` and `>` have to be escaped in text, quotes don't. Numbers
+    and booleans never need escaping and strings without special characters
+    are returned as they are.
+    """
+    typ = type(value)
+    if typ is str:
+        # `in` scans are much cheaper than replacing on strings that
+        # don't contain the character (which is nearly always)
+        if "&" in value:
+            value = value.replace("&", "&amp;")
+        if "<" in value:
+            value = value.replace("<", "&lt;")
+        if ">" in value:
+            value = value.replace(">", "&gt;")
+        return value
+    elif typ is int or typ is float or typ is bool:
+        return str(value)
+    else:
+        return escape_text(str(value))
+
+
+def escape_attr(value) -> str:
+    """Escape a value for use in a double or single quoted attribute value."""
+    typ = type(value)
+    if typ is str:
+        if "&" in value:
+            value = value.replace("&", "&amp;")
+        if "<" in value:
+            value = value.replace("<", "&lt;")
+        if ">" in value:
+            value = value.replace(">", "&gt;")
+        if '"' in value:
+            value = value.replace('"', "&quot;")
+        if "'" in value:
+            value = value.replace("'", "&#x27;")
+        return value
+    elif typ is int or typ is float or typ is bool:
+        return str(value)
+    else:
+        return escape_attr(str(value))
+
+
 def raw_string(text):
     return ["$raw", text]
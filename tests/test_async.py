@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from mu import ahtml
+from mu import aiter_html
+from mu import aiter_xml
+from mu import axml
+from mu import html
+from mu import Node
+from mu import xml
+
+
+class UL(Node):
+    def __init__(self, **attrs):
+        super().__init__("ul", **attrs)
+
+    def __call__(self, *nodes, **attrs):
+        nodes = [["li", node] for node in nodes]
+        return super().__call__(*nodes, **attrs)
+
+
+class Fetch(Node):
+    def __init__(self, delay=0, **attrs):
+        super().__init__("div", **attrs)
+        self.delay = delay
+
+    async def __call__(self, *nodes, **attrs):
+        await asyncio.sleep(self.delay)
+        return super().__call__(*nodes, **attrs)
+
+
+class Barrier(Node):
+    # waits until `parties` calls are running at the same time
+    waiting = []
+
+    def __init__(self, parties, **attrs):
+        super().__init__("div", **attrs)
+        self.parties = parties
+
+    async def __call__(self, *nodes, **attrs):
+        event = asyncio.Event()
+        Barrier.waiting.append(event)
+        if len(Barrier.waiting) == self.parties:
+            for waiting in Barrier.waiting:
+                waiting.set()
+            Barrier.waiting = []
+        await asyncio.wait_for(event.wait(), timeout=5)
+        return super().__call__(*nodes, **attrs)
+
+
+def render(coro):
+    return asyncio.run(coro)
+
+
+async def chunks(iterator):
+    return [chunk async for chunk in iterator]
+
+
+class TestAsyncRendering:
+    def test_sync_documents(self):
+        doc = [
+            "div#main",
+            {"title": "<doc>"},
+            "intro & text",
+            [UL(cls="list"), 1, 2],
+            ["p", None],
+            ["$comment", "end"],
+            (["br"], "tail"),
+        ]
+        assert render(axml(doc)) == xml(doc)
+        assert render(ahtml(doc)) == html(doc)
+        assert render(axml(["a"], "text", ["b", 1])) == xml(["a"], "text", ["b", 1])
+
+    def test_async_node(self):
+        doc = ["body", [Fetch(cls="x"), "a < b", ["p", 1]]]
+        assert render(axml(doc)) == (
+            '<body><div class="x">a &lt; b<p>1</p></div></body>'
+        )
+
+    def test_async_callable(self):
+        async def greeting():
+            return ["b", "hello"]
+
+        async def nothing():
+            return None
+
+        assert render(axml(["p", greeting, "!"])) == "<p><b>hello</b>!</p>"
+        # the element is empty once the awaitable resolves to None
+        assert render(axml(["p", nothing])) == xml(["p", None])
+        assert render(ahtml(["div", nothing])) == "<div></div>"
+
+    def test_below_resolved_attributes(self):
+        async def bold():
+            return "hello"
+
+        doc = ["p", lambda: {"id": "x"}, ["b", bold]]
+        assert render(axml(doc)) == '<p id="x"><b>hello</b></p>'
+        doc = ["div", [lambda: "p", lambda: {"id": "x"}, ["b", bold], "!"]]
+        assert render(axml(doc)) == '<div><p id="x"><b>hello</b>!</p></div>'
+
+    def test_siblings_run_concurrently(self):
+        doc = ["div", [[Barrier(5), f"item {i}"] for i in range(5)]]
+        markup = render(ahtml(doc))
+        assert markup == "<div>" + "".join(f"<div>item {i}</div>" for i in range(5)) + (
+            "</div>"
+        )
+
+    def test_nested_nodes_run_concurrently(self):
+        # each call waits until all of them are running
+        doc = ["ul", *[["li", [Barrier(4), i]] for i in range(1, 5)]]
+        assert render(ahtml(doc)) == html(
+            ["ul", *[["li", ["div", i]] for i in range(1, 5)]]
+        )
+
+    def test_streaming_order(self):
+        doc = ["ul", ["li", "first"], [Fetch(0.05), "slow"], ["li", "last"]]
+        result = render(chunks(aiter_xml(doc)))
+        assert "".join(result) == xml(
+            ["ul", ["li", "first"], ["div", "slow"], ["li", "last"]]
+        )
+        # the prefix before the slow node is flushed before awaiting it
+        assert result[0] == "<ul><li>first</li>"
+
+    def test_aiter_html(self):
+        assert "".join(render(chunks(aiter_html(["p", "x"])))) == "<p>x</p>"
+
+    def test_errors_propagate(self):
+        async def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            render(axml(["div", [Fetch(0.1)], fail]))
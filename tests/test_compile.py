@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from mu import compile
+from mu import html
+from mu import Node
+from mu import Slot
+from mu import xml
+
+
+class UL(Node):
+    def __init__(self, **attrs):
+        super().__init__("ul", **attrs)
+
+    def __call__(self, *nodes, **attrs):
+        nodes = [["li", node] for node in nodes]
+        return super().__call__(*nodes, **attrs)
+
+
+def nothing():
+    return None
+
+
+class TestCompile:
+    def test_static_template(self):
+        doc = ["div#main.card", ["p", {"id": 1}, "Q&A"], ["br"]]
+        template = compile(doc)
+        assert template.render() == xml(doc)
+        assert template._segments == [xml(doc)]
+
+    def test_named_slots(self):
+        template = compile(["p", "Hello, ", Slot("name"), "!"], method="html")
+        assert template.render(name="World") == "<p>Hello, World!</p>"
+        assert (
+            template.render(name=["b", "<you>"]) == "<p>Hello, <b>&lt;you&gt;</b>!</p>"
+        )
+        assert template.render() == "<p>Hello, !</p>"
+
+    def test_slot_default(self):
+        template = compile(["p", "Hello, ", Slot("name", default="stranger")])
+        assert template.render() == "<p>Hello, stranger</p>"
+
+    def test_slot_in_attributes(self):
+        template = compile(["ul", ["li", ["a", {"href": Slot("url")}, "home"]]])
+        assert template.render(url="/") == xml(
+            ["ul", ["li", ["a", {"href": "/"}, "home"]]]
+        )
+
+    def test_hole_in_attributes_position(self):
+        # a dict in front of the content becomes the attributes
+        doc = ["p", lambda: {"a": 1}, "t"]
+        assert compile(doc).render() == xml(doc) == '<p a="1">t</p>'
+        template = compile(["div", ["p", Slot("attrs"), "t"]])
+        assert template.render(attrs={"id": "x"}) == '<div><p id="x">t</p></div>'
+        assert template.render(attrs="s") == "<div><p>st</p></div>"
+        doc = ["p", {"b": 2}, lambda: {"a": 1}, "t"]
+        assert compile(doc).render() == xml(doc)
+
+    def test_slot_only_content(self):
+        # the element may end up without content so it's rendered as a whole
+        template = compile(["div", ["p", Slot("text")]], method="html")
+        assert template.render(text="x") == "<div><p>x</p></div>"
+        assert template.render() == html(["div", ["p", None]])
+        assert compile(["div", ["br", Slot("x")]], method="html").render() == (
+            "<div><br></div>"
+        )
+
+    def test_active_nodes(self):
+        doc = [
+            "div",
+            ["h1", "Title"],
+            [UL(cls="foo"), 1, 2],
+            UL(),
+            nothing,
+            ["p", nothing],
+            # tuples returned in content are flattened
+            ["p", "Hi ", lambda: ("Bob", "!")],
+            ["p", lambda: ("Hello world", "!")],
+            # a sequence is an element when its head renders to a tag
+            [lambda: "t"],
+            [None, "b", lambda: "x"],
+            [["br"], lambda: ("i", "x")],
+            ["p", None, {"a": 1}, nothing],
+        ]
+        assert compile(doc).render() == xml(doc)
+        assert compile(doc, method="html").render() == html(doc)
+
+    def test_multiple_nodes(self):
+        template = compile(["a"], ["b", Slot("x")], ["c"])
+        assert template.render(x=1) == xml(["a"], ["b", 1], ["c"])
@@ -11,6 +11,7 @@ from mu import is_element
 from mu import is_empty
 from mu import is_special_node
 from mu import Node
+from mu import SugarNames
 from mu import tag
 from mu import xml
 
@@ -36,6 +37,33 @@ class TestTagNames:
         assert xml(["div#foo.bar.baz"]) == '<div class="bar baz" id="foo"/>'
 
 
+class TestSugarNames:
+    def test_transform(self):
+        names = SugarNames()
+        assert names.transform(["div"]) == ["div"]
+        assert names.transform(["div#a.b.c", "x"]) == [
+            "div",
+            {"id": "a", "class": ["b", "c"]},
+            "x",
+        ]
+        assert names.transform(["div#a.b", {"id": "z", "class": ["c", "b", "c"]}]) == [
+            "div",
+            {"id": "z", "class": ["b", "c"]},
+        ]
+        assert names.transform(["p#a", {"class": "c"}]) == [
+            "p",
+            {"id": "a", "class": "c"},
+        ]
+
+    def test_parse_cache(self):
+        names = SugarNames(maxsize=2)
+        for _ in range(3):
+            names.transform(["div.a"])
+            names.transform(["p"])
+        info = names.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (4, 2, 2)
+
+
 class TestAccessors:
     def test_tag(self):
         assert tag(["foo"]) == "foo"
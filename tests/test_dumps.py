@@ -1,6 +1,27 @@
 from __future__ import annotations
 
+import array
+import collections
+import copy
+import dataclasses
+import datetime
+import enum
+import io
+import pickle
+import tracemalloc
+
+import mu
+import pytest
 from mu import dumps
+from mu import dumps_xml
+from mu import get_attr
+from mu import iterdumps
+from mu import loads
+from mu import PACKED_ARRAY_THRESHOLD
+from mu import parse
+from mu import register_encoder
+from mu import serializers
+from mu import xml
 
 
 class Foo:
@@ -164,3 +185,240 @@ class TestDumps:
             ["_", {"as": "integer"}, 1],
             ["_", {"as": "complex"}, 1j],
         ]
+
+
+class TestIterDumps:
+    VALUE = {"a": [1, "x", None], "b": {"c": True, "d": 2.5}, "e": Baz(), "f": foobar}
+
+    def test_events(self):
+        assert list(iterdumps({"x": [1, "a"]})) == [
+            ("start", "_", {"as": "object"}),
+            ("start", "x", {"as": "array"}),
+            ("start", "_", {"as": "integer"}),
+            ("data", 1),
+            ("end", "_"),
+            ("start", "_", {}),
+            ("data", "a"),
+            ("end", "_"),
+            ("end", "x"),
+            ("end", "_"),
+        ]
+
+    def test_markup(self):
+        for method in ["xml", "html", "xhtml", "sgml"]:
+            assert "".join(iterdumps(self.VALUE, method=method)) == serializers[
+                method
+            ].write(dumps(self.VALUE))
+        assert "".join(iterdumps([], key="rows", method="xml")) == '<rows as="array"/>'
+
+    def test_iterators_are_arrays(self):
+        rows = ({"id": i} for i in range(3))
+        assert parse("".join(iterdumps(rows, method="xml"))) == parse(
+            xml(dumps([{"id": i} for i in range(3)]))
+        )
+        assert list(iterdumps(iter([]))) == list(iterdumps([]))
+
+    def test_memory_depends_on_depth(self):
+        rows = ({"id": i, "name": f"row {i}"} for i in range(10_000))
+        tracemalloc.start()
+        for _ in iterdumps(rows, method="xml"):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert peak < 100_000
+
+
+class TestDumpsXml:
+    VALUE = {
+        "total": 2,
+        "next": None,
+        "items": [
+            {"id": 0, "name": "a < b", "price": 0.0, "ok": True, "tags": []},
+            {"id": 1, "name": "", "price": 2.5, "ok": False, "tags": ("x",)},
+        ],
+    }
+
+    def test_same_as_xml_dumps(self):
+        assert dumps_xml(self.VALUE) == xml(dumps(self.VALUE))
+        assert dumps_xml([], key="rows") == xml(dumps([], key="rows"))
+        for value in [None, 0, -1, 1.5, 1j, "", "x & y", True, False, {}, ()]:
+            assert dumps_xml(value) == xml(dumps(value))
+
+    def test_objects_and_functions(self):
+        value = {"bar": Bar(), "baz": Baz(), "foo": Foo(), "f": foobar, "g": iter([])}
+        assert dumps_xml(value) == xml(dumps(value))
+
+    def test_keys(self):
+        value = {"a.b": 1, "c#d": [2], "e:f": "x", "caf\u00e9": {}}
+        assert dumps_xml(value) == xml(dumps(value))
+        with pytest.raises(ValueError):
+            dumps_xml({"not a name": 1})
+
+    def test_file(self):
+        fp = io.StringIO()
+        assert dumps_xml(self.VALUE, fp) is None
+        assert fp.getvalue() == xml(dumps(self.VALUE))
+        fp = io.BytesIO()
+        dumps_xml({"name": "caf\u00e9"}, fp, encoding="latin-1")
+        assert fp.getvalue() == xml(dumps({"name": "caf\u00e9"})).encode("latin-1")
+
+
+class Color(enum.IntEnum):
+    RED = 1
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: float
+    label: str = "p"
+
+
+@pytest.fixture
+def encoders():
+    saved = dict(mu._encoders)
+    yield
+    mu._encoders.clear()
+    mu._encoders.update(saved)
+    mu._encoder_cache.clear()
+
+
+class TestEncoders:
+    def test_subclasses(self):
+        assert dumps(Color.RED) == ["_", {"as": "integer"}, Color.RED]
+        assert dumps(collections.OrderedDict(a="b")) == [
+            "_",
+            {"as": "object"},
+            ["a", "b"],
+        ]
+
+    def test_register(self, encoders):
+        register_encoder(
+            datetime.date, lambda value, key: [key, {"as": "date"}, value.isoformat()]
+        )
+        day = datetime.date(2024, 2, 29)
+        assert dumps({"day": day}) == [
+            "_",
+            {"as": "object"},
+            ["day", {"as": "date"}, "2024-02-29"],
+        ]
+        # datetime is a subclass of date
+        assert dumps(datetime.datetime(2024, 2, 29))[1] == {"as": "date"}
+        assert dumps_xml({"day": day}) == xml(dumps({"day": day}))
+        assert "".join(iterdumps([day], method="xml")) == xml(dumps([day]))
+
+    def test_register_replaces_builtin(self, encoders):
+        register_encoder(int, lambda value, key: [key, {"as": "number"}, value])
+        assert dumps(Color.RED) == ["_", {"as": "number"}, Color.RED]
+        assert dumps_xml([1]) == '<_ as="array"><_ as="number">1</_></_>'
+        assert list(iterdumps(1)) == [
+            ("start", "_", {"as": "number"}),
+            ("data", 1),
+            ("end", "_"),
+        ]
+
+    def test_dataclass(self):
+        assert dumps(Point(1, 2.5)) == [
+            "_",
+            {"as": "object"},
+            ["x", {"as": "integer"}, 1],
+            ["y", {"as": "float"}, 2.5],
+            ["label", "p"],
+        ]
+        assert loads(dumps(Point(1, 2.5))) == {"x": 1, "y": 2.5, "label": "p"}
+
+    def test_buffers(self):
+        assert dumps(array.array("i", [1, 2])) == dumps([1, 2])
+        assert dumps(array.array("d", [0.5])) == dumps([0.5])
+        assert dumps(memoryview(b"ab")) == dumps([97, 98])
+        assert dumps(memoryview(bytes(4)).cast("B", (2, 2))) == dumps([[0, 0], [0, 0]])
+        assert dumps_xml(array.array("f", [1.5])) == xml(dumps([1.5]))
+
+    def test_scalar_buffers(self):
+        assert dumps(memoryview(b"\x01\0\0\0").cast("i", shape=[])) == dumps(1)
+        assert dumps(memoryview(bytes(8)).cast("d", shape=[]), "x") == dumps(0.0, "x")
+        assert dumps(memoryview(b"\x01").cast("?", shape=[])) == dumps(True)
+
+    def test_bytes(self):
+        assert dumps(b"ab") == ["_", {"as": "null"}]
+        assert dumps(bytearray(b"ab")) == ["_", {"as": "null"}]
+        assert dumps(memoryview(b"ab").cast("c")) == ["_", {"as": "null"}]
+        assert dumps(memoryview(b"a").cast("c", shape=[])) == ["_", {"as": "null"}]
+
+    def test_objects_keep_their_encoding(self):
+        assert dumps(Bar()) == ["_", {"as": "mu"}, ["$yo!"]]
+        assert dumps(foobar) == ["_", {"as": "null"}]
+        assert dumps(Foo()) == ["_", {"as": "null"}]
+
+
+class TestPackedArrays:
+    N = PACKED_ARRAY_THRESHOLD
+
+    def test_ints_and_floats(self):
+        assert dumps(list(range(self.N))) == [
+            "_",
+            {"as": "array", "item-type": "integer"},
+            " ".join(str(i) for i in range(self.N)),
+        ]
+        floats = tuple(i / 3 for i in range(self.N))
+        assert dumps(floats, key="x") == [
+            "x",
+            {"as": "array", "item-type": "float"},
+            " ".join(repr(f) for f in floats),
+        ]
+
+    def test_not_packed(self):
+        # short, mixed and bool arrays have an element per item
+        assert len(dumps([1] * (self.N - 1))) == self.N + 1
+        assert len(dumps([1, 2.5] * self.N)) == 2 * self.N + 2
+        assert len(dumps([True] * self.N)) == self.N + 2
+
+    def test_buffers(self):
+        assert dumps(array.array("q", range(self.N))) == dumps(list(range(self.N)))
+        assert dumps(memoryview(array.array("d", [0.5] * self.N))) == dumps(
+            [0.5] * self.N
+        )
+
+    def test_round_trip(self):
+        value = {"ints": list(range(-self.N, self.N)), "floats": [0.1] * self.N}
+        assert loads(dumps(value)) == value
+        assert loads(parse(xml(dumps(value)))) == value
+        assert dumps_xml(value) == xml(dumps(value))
+        assert "".join(iterdumps(value, method="xml")) == xml(dumps(value))
+
+    def test_registered_encoder(self, encoders):
+        register_encoder(int, lambda value, key: [key, {"as": "number"}, value])
+        assert len(dumps(list(range(self.N)))) == self.N + 2
+
+
+class TestSharedAttrs:
+    def test_shared(self):
+        node = dumps([1, 2, True, None], shared_attrs=True)
+        assert node[2][1] is node[3][1]
+        assert get_attr("as", node[2]) == "integer"
+        with pytest.raises(TypeError):
+            node[2][1]["as"] = "float"
+        with pytest.raises(TypeError):
+            node[4][1].update(value="false()")
+        assert dumps(1, shared_attrs=True) == ["_", {"as": "integer"}, 1]
+
+    def test_own_attrs(self):
+        node = dumps({"a": [1, 2], "b": Bar()})
+        node[2][2][1]["id"] = "x"
+        node[1]["id"] = "y"
+        assert node[2][3][1] == {"as": "integer"}
+        assert dumps(1)[1] == {"as": "integer"}
+        assert dumps([1])[1] == {"as": "array"}
+
+    def test_own_event_attrs(self):
+        for event in iterdumps({"a": [1] * 2 * PACKED_ARRAY_THRESHOLD, "b": [1]}):
+            if event[0] == "start":
+                event[2]["id"] = "x"
+        value = {"a": [1] * 2 * PACKED_ARRAY_THRESHOLD, "b": [1]}
+        assert "id=" not in xml(dumps(value, shared_attrs=True))
+
+    def test_copies_are_plain_dicts(self):
+        node = dumps([1], shared_attrs=True)
+        assert type(copy.deepcopy(node)[2][1]) is dict
+        assert type(pickle.loads(pickle.dumps(node))[2][1]) is dict
+        assert type(node[2][1].copy()) is dict
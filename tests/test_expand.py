@@ -14,6 +14,11 @@ class TestExpand:
         assert expand([(1), 2, (3)]) == [1, 2, 3]
         assert expand(["foo", {}, "bar"]) == ["foo", "bar"]
 
+    def test_expand_to_none(self):
+        assert expand([[UL(), 1], None, "a"]) == [["ul", ["li", 1]], "a"]
+        assert expand([[Nothing()], "a"]) == [None, "a"]
+        assert expand(["p", lambda: None, "a"]) == ["p", None, "a"]
+
     def test_expand_no_sugar(self):
         assert expand(["p.foo#bar", "baz"]) == ["p.foo#bar", "baz"]
 
@@ -27,6 +32,14 @@ class UL(Node):
         return super().__call__(*nodes, **attrs)
 
 
+class Nothing(Node):
+    def __init__(self):
+        super().__init__("nothing")
+
+    def __call__(self, *nodes, **attrs):
+        return None
+
+
 class TestExpandActiveNode:
     def test_active_element(self):
         assert expand(["div", [UL(cls="foo"), 1, 2, 3]]) == [
@@ -59,3 +72,17 @@ class TestExpandActiveNode:
                 ],
             ],
         ]
+
+
+class TestExpandDeep:
+    def test_deeply_nested(self):
+        depth = 100_000
+        doc = ["leaf", [UL(), "x"]]
+        for _ in range(depth):
+            doc = ["div", {"class": "x"}, None, doc]
+        node = expand(doc)
+        for _ in range(depth):
+            assert node[:2] == ["div", {"class": "x"}]
+            assert len(node) == 3
+            node = node[2]
+        assert node == ["leaf", ["ul", ["li", "x"]]]
@@ -1,6 +1,14 @@
 from __future__ import annotations
 
+from mu import dumps
+from mu import iterdumps
+from mu import iterevents
+from mu import iterloads
 from mu import loads
+from mu import PACKED_ARRAY_THRESHOLD
+from mu import parse
+from mu import register_decoder
+from mu import xml
 
 
 class Foo:
@@ -98,3 +106,58 @@ class TestLoads:
         assert loads(["_", {"as": "array"}, ["_", {"as": "object"}, ["a", 1]]]) == [
             {"a": 1}
         ]
+
+
+class TestIterLoads:
+    VALUE = {"a": ["y", "x", None], "b": {"c": True}, "d": [["z"], []]}
+
+    def test_whole_value(self):
+        assert list(iterloads(iterdumps(self.VALUE), depth=0)) == [
+            loads(dumps(self.VALUE))
+        ]
+
+    def test_items(self):
+        rows = ([i, f"row {i}"] for i in range(3))
+        assert list(iterloads(iterdumps(rows))) == [
+            loads(dumps([i, f"row {i}"])) for i in range(3)
+        ]
+        assert list(iterloads(iterdumps(self.VALUE), depth=2)) == [
+            "y",
+            "x",
+            None,
+            True,
+            ["z"],
+            [],
+        ]
+
+    def test_packed_arrays(self):
+        value = [list(range(PACKED_ARRAY_THRESHOLD)), [0.5] * PACKED_ARRAY_THRESHOLD]
+        assert list(iterloads(iterdumps(value[0]))) == value[0]
+        assert list(iterloads(iterdumps(value), depth=2)) == value[0] + value[1]
+        assert list(iterloads(iterevents(xml(dumps(value[1]))))) == value[1]
+        assert list(iterloads(iterdumps(value))) == value
+
+    def test_parsed_events(self):
+        markup = xml(dumps(["a", {"b": True, "c": None}, ["d"]]))
+        assert list(iterloads(iterevents(markup), depth=0)) == [
+            ["a", {"b": True, "c": None}, ["d"]]
+        ]
+        assert list(iterloads(iterevents(markup))) == [
+            "a",
+            {"b": True, "c": None},
+            ["d"],
+        ]
+
+
+class TestDecoders:
+    def test_numbers(self):
+        value = [1, 0, 2.5, 0.0, 1j]
+        assert loads(dumps(value)) == value
+        assert loads(parse(xml(dumps(value)))) == value
+
+    def test_unknown(self):
+        assert loads(["_", {"as": "date"}, "2024-02-29"]) is None
+
+    def test_register(self):
+        register_decoder("upper", lambda node: node[2].upper())
+        assert loads(["_", {"as": "array"}, ["_", {"as": "upper"}, "abc"]]) == ["ABC"]
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import sys
+
+import pytest
 from mu import CData
 from mu import Comment
+from mu import component_cache
+from mu import ComponentCache
 from mu import Element
 from mu import expand
+from mu import html
+from mu import HtmlSerializer
 from mu import Node
 from mu import PI
+from mu import pure
 from mu import Raw
+from mu import render_many
 from mu import Text
+from mu import xml
 
 
 class TestElement:
@@ -61,6 +71,22 @@ class TestElement:
         assert hasattr(el.attrs, "cls") is False
         assert el(cls="bar") == ["p", {"class": "bar"}]
 
+    def test_slots(self):
+        for el in (Element("p"), Text("x"), PI("x"), CData("x"), Raw("x")):
+            assert not hasattr(el, "__dict__")
+        assert not hasattr(Comment("x"), "__dict__")
+
+    def test_call_keeps_node_attrs(self):
+        el = Element("p", "foo", x=1)
+        assert el(y=2) == ["p", {"x": 1, "y": 2}, "foo"]
+        assert el.attrs == {"x": 1}
+        assert el("bar") == ["p", {"x": 1}, "foo", "bar"]
+        assert el.content == ["foo"]
+        out = expand([el])
+        out[1]["y"] = 2
+        assert el.attrs == {"x": 1}
+        assert xml([el]) == '<p x="1">foo</p>'
+
 
 class TestText:
     def test_text_node(self):
@@ -115,6 +141,12 @@ class TestCustomNode:
             ["li", 3],
         ]
 
+    def test_custom_node_attributes(self):
+        # subclasses without __slots__ can have their own attributes
+        ul = UL()
+        ul.items = [1, 2]
+        assert ul(*ul.items) == ["ul", ["li", 1], ["li", 2]]
+
     def test_custom_node_in_elem_pos(self):
         div = ["div", [UL(cls="foo"), 1, 2, 3]]
         # div is a literal so use expand()
@@ -128,3 +160,98 @@ class TestCustomNode:
                 ["li", 3],
             ],
         ]
+
+
+@pure
+class Icon(Node):
+    calls = 0
+
+    def __init__(self, name, **attrs):
+        super().__init__("svg", ["use", {"href": f"#{name}"}], **attrs)
+
+    def __call__(self, *nodes, **attrs):
+        Icon.calls += 1
+        return super().__call__(*nodes, **attrs)
+
+
+class TestPureNode:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        component_cache.cache_clear()
+        Icon.calls = 0
+        yield
+        component_cache.cache_clear()
+
+    def test_expand(self):
+        doc = ["p", Icon("a"), [Icon("a"), "x"], [Icon("a"), "x"], Icon("b")]
+        expected = [
+            "p",
+            ["svg", ["use", {"href": "#a"}]],
+            ["svg", ["use", {"href": "#a"}], "x"],
+            ["svg", ["use", {"href": "#a"}], "x"],
+            ["svg", ["use", {"href": "#b"}]],
+        ]
+        assert expand(doc) == expected
+        assert Icon.calls == 3
+        assert expand(doc) == expected
+        assert Icon.calls == 3
+        assert component_cache.cache_info().hits == 5
+
+    def test_expanded_output_is_a_copy(self):
+        doc = ["div", Icon("x"), [Icon("x"), {"id": "i"}]]
+        expected = html(doc)
+        for _ in range(2):
+            expanded = expand(doc)
+            expanded[1].append("changed")
+            expanded[1][1][1]["href"] = "#changed"
+            expanded[2][1]["id"] = "changed"
+        assert html(doc) == expected
+        assert expand(doc) == expand(["div", Icon("x"), [Icon("x"), {"id": "i"}]])
+
+    def test_markup(self):
+        icon = Icon("a", cls="icon")
+        doc = ["div", ["p", icon], ["p", icon, [icon]], Icon("a"), 1]
+        serializer = HtmlSerializer(fused=True)
+        assert serializer.write(doc) == html(doc)
+        assert render_many([doc] * 3) == [html(doc)] * 3
+        # icon, [icon] and Icon("a")
+        assert Icon.calls == 3
+
+    def test_types_in_key(self):
+        assert expand([Icon("a"), 1]) == ["svg", ["use", {"href": "#a"}], 1]
+        assert expand([Icon("a"), True])[2] is True
+
+    def test_uncacheable_arguments(self):
+        # arguments that can't be part of a key are rendered every time
+        doc = [Icon("a"), Element("b"), {"x": [1]}]
+        assert expand(doc) == expand(doc)
+        assert Icon.calls == 2
+        assert len(component_cache) == 0
+
+    def test_invalidate(self):
+        expand(["p", Icon("a")])
+        component_cache.invalidate(Element)
+        assert len(component_cache) == 1
+        component_cache.invalidate(Icon)
+        assert len(component_cache) == 0
+        expand(["p", Icon("a")])
+        assert Icon.calls == 2
+
+    def test_size_eviction(self):
+        # entries are sized in bytes
+        size = sys.getsizeof("12345")
+        cache = ComponentCache(maxsize=2 * size)
+        cache.put(("a",), "12345")
+        cache.put(("b",), "54321")
+        assert cache.get(("a",)) == "12345"
+        cache.put(("c",), "1")
+        assert cache.get(("b",)) is None
+        cache.put(("d",), "x" * 2 * size)
+        assert len(cache) == 2
+        assert cache.cache_info() == (1, 1, 2 * size, size + sys.getsizeof("1"))
+        # expanded output is sized with its items
+        cache = ComponentCache()
+        cache.put(("a",), ["p", {"id": "x"}])
+        assert cache.cache_info().currsize == sum(
+            map(sys.getsizeof, (["p", {"id": "x"}], "p", {"id": "x"}, "id", "x"))
+        )
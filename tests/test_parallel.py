@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from concurrent import futures
+
+import pytest
+from mu import html
+from mu import Node
+from mu import PARALLEL_THRESHOLD
+from mu import render_many
+from mu import render_parallel
+from mu import serializers
+from mu import xml
+
+
+class UL(Node):
+    def __init__(self, **attrs):
+        super().__init__("ul", **attrs)
+
+    def __call__(self, *nodes, **attrs):
+        nodes = [["li", node] for node in nodes]
+        return super().__call__(*nodes, **attrs)
+
+
+def doc(n=50):
+    return [
+        "div#main",
+        {"title": "<doc>"},
+        "intro & text",
+        [UL(cls="list"), *range(n)],
+        [["p.item", {"data-i": i}, f"item {i} <", ["br"]] for i in range(n)],
+        ["$comment", "end"],
+        ["empty"],
+    ]
+
+
+class TestRenderParallel:
+    @pytest.mark.parametrize("method", ["xml", "html", "xhtml", "sgml"])
+    def test_threads(self, method):
+        expected = serializers[method].write(doc())
+        assert (
+            render_parallel(
+                doc(), method=method, workers=2, threshold=0, executor="thread"
+            )
+            == expected
+        )
+
+    def test_processes(self):
+        assert render_parallel(doc(), workers=2, threshold=0) == xml(doc())
+
+    @pytest.mark.parametrize("depth", [0, 1, 2, 3])
+    def test_depth(self, depth):
+        assert render_parallel(
+            doc(), depth=depth, threshold=0, executor="thread"
+        ) == xml(doc())
+
+    def test_executor(self):
+        with futures.ThreadPoolExecutor(3) as executor:
+            assert render_parallel(
+                doc(), method="html", threshold=0, executor=executor
+            ) == html(doc())
+
+    def test_multiple_nodes(self):
+        assert render_parallel(
+            ["a", 1], ["b", 2], threshold=0, executor="thread"
+        ) == xml(["a", 1], ["b", 2])
+
+    def test_small_document_is_serial(self):
+        # no executor needed below the threshold
+        assert render_parallel(doc(3), executor=None) == xml(doc(3))
+
+    def test_unknown_executor(self):
+        with pytest.raises(ValueError):
+            render_parallel(doc(3), threshold=0, executor="fibers")
+
+    def test_workers(self):
+        large = doc(10_000)
+        assert html(large, workers=2) == html(large)
+        assert xml(large, workers=2, encoding="utf-8") == xml(large).encode()
+        assert xml(large, workers=2, encoding="ascii") == xml(large, encoding="ascii")
+        assert xml(large, workers=2, indent=2) == xml(large, indent=2)
+
+    def test_workers_settings(self):
+        svg = [
+            "svg:svg",
+            {"xmlns:svg": "http://www.w3.org/2000/svg"},
+            [["svg:text", {"x": i}, "café"] for i in range(PARALLEL_THRESHOLD)],
+        ]
+        assert xml(svg, workers=2, encoding="latin-1") == xml(svg, encoding="latin-1")
+        with pytest.raises(UnicodeEncodeError):
+            xml(
+                ["root", [["entrée", i] for i in range(PARALLEL_THRESHOLD)]],
+                workers=2,
+                encoding="ascii",
+            )
+
+
+class TestRenderMany:
+    def test_render_many(self):
+        docs = [doc(i) for i in range(5)] + [["p", "a < b"], "text", None]
+        assert render_many(docs) == [html(d) for d in docs]
+        assert render_many(docs, method="xml") == [xml(d) for d in docs]
+
+    def test_lazy(self):
+        docs = (["li", i] for i in range(3))
+        markup = render_many(docs, lazy=True)
+        assert next(markup) == "<li></li>"
+        assert list(markup) == ["<li>1</li>", "<li>2</li>"]
+
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    def test_workers(self, executor):
+        docs = [doc(i) for i in range(20)]
+        assert render_many(iter(docs), workers=2, batch_size=3, executor=executor) == [
+            html(d) for d in docs
+        ]
+
+    def test_empty(self):
+        assert render_many([]) == []
+        assert render_many([], workers=2, executor="thread") == []
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import io
+from xml.parsers.expat import ExpatError
+
+import pytest
+from mu import iterevents
+from mu import iterparse
+from mu import parse
+from mu import xml
+from mu.parser import READ_SIZE
+
+
+class TestParse:
+    def test_elements(self):
+        assert parse("<foo/>") == ["foo"]
+        assert parse('<foo a="10">bar</foo>') == ["foo", {"a": "10"}, "bar"]
+        assert parse("<p>Hello, <b>World</b>!</p>") == [
+            "p",
+            "Hello, ",
+            ["b", "World"],
+            "!",
+        ]
+
+    def test_special_nodes(self):
+        assert parse("<x><!-- a comment --><?foo bar?><![CDATA[<y>]]></x>") == [
+            "x",
+            ["$comment", "a comment"],
+            ["$pi", "foo", "bar"],
+            ["$cdata", "<y>"],
+        ]
+
+    def test_prolog(self):
+        assert parse('<?xml version="1.0"?><x/>') == ["x"]
+        assert parse("<?go now?><x/>") == [["$pi", "go", "now"], ["x"]]
+
+    def test_entities_and_namespaces(self):
+        assert parse('<s:x xmlns:s="urn:s" s:a="&lt;&#233;">&amp;</s:x>') == [
+            "s:x",
+            {"xmlns:s": "urn:s", "s:a": "<é"},
+            "&",
+        ]
+
+    def test_strip(self):
+        assert parse("<a>\n  <b> x </b>\n</a>", strip=True) == ["a", ["b", " x "]]
+        assert parse("<a>\n  <b/>\n</a>") == ["a", "\n  ", ["b"], "\n"]
+
+    def test_round_trip(self):
+        doc = [
+            "svg:svg",
+            {"xmlns:svg": "http://www.w3.org/2000/svg"},
+            ["svg:rect", {"height": "100", "width": "200"}],
+            ["$comment", "note"],
+            ["p", "a &amp; <b>", ["$cdata", "<raw>"]],
+        ]
+        assert parse(xml(doc)) == doc
+        assert xml(parse(xml(doc))) == xml(doc)
+
+    def test_sources(self, tmp_path):
+        text = "<p>café</p>"
+        assert parse(text.encode("utf-8")) == ["p", "café"]
+        assert parse(io.StringIO(text)) == ["p", "café"]
+        assert parse(io.BytesIO(text.encode("utf-8"))) == ["p", "café"]
+        path = tmp_path / "doc.xml"
+        path.write_text('<?xml version="1.0" encoding="latin-1"?>' + text, "latin-1")
+        assert parse(path) == ["p", "café"]
+
+    def test_long_text(self):
+        text = "x" * (READ_SIZE * 2 + 10)
+        assert parse(f"<p>{text}</p>") == ["p", text]
+
+    def test_not_well_formed(self):
+        with pytest.raises(ExpatError):
+            parse("<p>")
+
+
+class CountingReader(io.BytesIO):
+    reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+class TestIterParse:
+    def test_children_of_root(self):
+        feed = '<feed>\n<e id="1">a</e>\n<e id="2"><x/></e><!--c--></feed>'
+        assert list(iterparse(feed)) == [
+            ["e", {"id": "1"}, "a"],
+            ["e", {"id": "2"}, ["x"]],
+            ["$comment", "c"],
+        ]
+
+    def test_depth(self):
+        feed = "<feed><e><t>1</t></e><e><t>2</t></e></feed>"
+        assert list(iterparse(feed, depth=2)) == [["t", "1"], ["t", "2"]]
+        assert list(iterparse(feed, depth=0)) == [
+            ["feed", ["e", ["t", "1"]], ["e", ["t", "2"]]]
+        ]
+
+    def test_streaming(self):
+        entries = "".join(f"<e id='{i}'>{'x' * 100}</e>" for i in range(5000))
+        source = CountingReader(f"<feed>{entries}</feed>".encode())
+        items = iterparse(source)
+        assert next(items) == ["e", {"id": "0"}, "x" * 100]
+        assert source.reads == 1
+        assert sum(1 for _ in items) == 4999
+        assert source.reads > 2
+
+
+def build(events):
+    stack = [[]]
+    for event in events:
+        if event[0] == "start":
+            node = [event[1], event[2]] if event[2] else [event[1]]
+            stack[-1].append(node)
+            stack.append(node)
+        elif event[0] == "data":
+            stack[-1].append(event[1])
+        else:
+            stack.pop()
+    return stack[0]
+
+
+class TestIterEvents:
+    def test_events(self):
+        assert list(iterevents('<a x="1">t<b/><!-- c --></a>')) == [
+            ("start", "a", {"x": "1"}),
+            ("data", "t"),
+            ("start", "b", {}),
+            ("end", "b"),
+            ("start", "$comment", {}),
+            ("data", "c"),
+            ("end", "$comment"),
+            ("end", "a"),
+        ]
+
+    def test_same_nodes_as_parse(self):
+        doc = '<?pi x?><a>x &amp; y<![CDATA[<z>]]><b c="d">\n</b><?p?></a>'
+        assert build(iterevents(doc)) == parse(doc)
+        assert build(iterevents(doc, strip=True)) == [parse(doc, strip=True)][0]
+
+    def test_long_text(self):
+        text = "x" * (READ_SIZE * 2 + 10)
+        assert list(iterevents(f"<a>{text}</a>")) == [
+            ("start", "a", {}),
+            ("data", text),
+            ("end", "a"),
+        ]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import mu
+import pytest
+from mu import iter_xml
+from mu import Node
+from mu import profile
+from mu import util
+from mu import xml
+from mu import XmlSerializer
+
+
+class UL(Node):
+    def __init__(self, **attrs):
+        super().__init__("ul", **attrs)
+
+    def __call__(self, *nodes, **attrs):
+        nodes = [["li", node] for node in nodes]
+        return super().__call__(*nodes, **attrs)
+
+
+class TestProfile:
+    def test_counts(self):
+        doc = ["div", {"id": 1}, [UL(), "a", 2], ["$comment", "c"], ["br"]]
+        with profile() as stats:
+            markup = xml(doc)
+        assert markup == xml(doc)
+        assert stats.nodes == {"element": 5, "str": 1, "int": 1, "$comment": 1}
+        assert stats.node_calls == {"UL": 1}
+        assert stats.node_time["UL"] > 0
+        # div, id, ul, li, li, br
+        assert stats.names_validated == 6
+        assert stats.escapes == 3
+        assert stats.chars_emitted == len(markup)
+        assert stats.bytes_emitted == 0
+        assert stats.expand_time > 0
+        assert stats.serialize_time > 0
+        assert stats.elapsed >= stats.serialize_time
+
+    def test_bytes(self):
+        with profile() as stats:
+            xml(["p", "café"], encoding="utf-8")
+        assert stats.chars_emitted == 11
+        assert stats.bytes_emitted == 12
+
+    def test_suspended_iterators(self):
+        doc = ["ul", [["li", i] for i in range(1, 4)]]
+        with profile() as stats:
+            fragments = iter_xml(doc)
+            first = next(fragments)
+            markup = xml(["p", "text"])
+            rest = list(iter_xml(["br"])), list(fragments)
+        assert stats.chars_emitted == len(
+            first + markup + "".join(rest[0]) + "".join(rest[1])
+        )
+
+    def test_callback(self):
+        results = []
+        with profile(callback=results.append) as stats:
+            xml(["p"])
+        assert results == [stats]
+
+    def test_restores_originals(self):
+        originals = (
+            mu.expand,
+            util.escape_text,
+            XmlSerializer.__dict__["_iter_node"],
+            Node.__dict__["__call__"],
+            UL.__dict__["__call__"],
+        )
+        with pytest.raises(ValueError):
+            with profile():
+                raise ValueError()
+        assert originals == (
+            mu.expand,
+            util.escape_text,
+            XmlSerializer.__dict__["_iter_node"],
+            Node.__dict__["__call__"],
+            UL.__dict__["__call__"],
+        )
+        with profile() as stats:
+            pass
+        xml(["p", UL()])
+        assert stats.nodes == {}
+
+    def test_nested_profile(self):
+        with profile():
+            with pytest.raises(RuntimeError):
+                with profile():
+                    pass
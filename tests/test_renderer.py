@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from mu import html
+from mu import Node
+from mu import Renderer
+from mu import xml
+
+
+class UL(Node):
+    def __init__(self, **attrs):
+        super().__init__("ul", **attrs)
+
+    def __call__(self, *nodes, **attrs):
+        nodes = [["li", node] for node in nodes]
+        return super().__call__(*nodes, **attrs)
+
+
+def page():
+    return [
+        "div#main",
+        ["h1", "Title"],
+        ["p.intro", {"title": "<intro>"}, "Fish & chips"],
+        ["ul", [["li", i] for i in range(3)]],
+    ]
+
+
+class TestRenderer:
+    def test_render(self):
+        doc = page()
+        renderer = Renderer()
+        assert renderer.render(doc) == xml(doc)
+        assert renderer.reused == 0
+        assert renderer.rendered == 8
+        assert renderer.render(doc) == xml(doc)
+        assert renderer.reused == 8
+        assert renderer.rendered == 0
+
+    def test_changed_text(self):
+        doc = page()
+        renderer = Renderer(method="html")
+        renderer.render(doc)
+        doc[1][1] = "New <title>"
+        assert renderer.render(doc) == html(doc)
+        # h1 and div#main, the other elements are reused
+        assert renderer.rendered == 2
+        assert renderer.reused == 6
+
+    def test_changed_attributes(self):
+        doc = page()
+        renderer = Renderer()
+        renderer.render(doc)
+        doc[2][1]["title"] = "changed"
+        assert renderer.render(doc) == xml(doc)
+        doc[2][1]["class"] = ["a", "b"]
+        assert renderer.render(doc) == xml(doc)
+        doc[2][1]["class"].append("c")
+        assert renderer.render(doc) == xml(doc)
+        assert renderer.rendered == 2
+
+    def test_changed_children(self):
+        doc = page()
+        renderer = Renderer()
+        renderer.render(doc)
+        doc[3][1].append(["li", 3])
+        assert renderer.render(doc) == xml(doc)
+        doc[3][1][0] = ["li", "zero"]
+        assert renderer.render(doc) == xml(doc)
+        del doc[3]
+        assert renderer.render(doc) == xml(doc)
+        doc.append(["p", None])
+        assert renderer.render(doc) == xml(doc)
+
+    def test_active_nodes(self):
+        items = ["a", "b"]
+
+        def count():
+            return len(items)
+
+        doc = ["div", ["p", "static"], [UL(), *items], ["span", count], ["br", count]]
+        renderer = Renderer()
+        assert renderer.render(doc) == xml(doc)
+        items.append("c")
+        doc[2].append("c")
+        assert renderer.render(doc) == xml(doc)
+        assert renderer.reused == 1
+
+    def test_elements_with_only_active_children(self):
+        # an element may end up empty so it's rendered as a whole
+        def nothing():
+            return None
+
+        doc = ["div", ["p", nothing], ["p", "x", nothing]]
+        assert Renderer().render(doc) == xml(doc)
+        assert Renderer(method="html").render(doc) == html(doc)
+
+    def test_value_types(self):
+        # equal values of other types render differently
+        doc = ["div", ["p", {"x": 1}, 1], ["p", "x"]]
+        renderer = Renderer()
+        for value in (True, 1.0, 1, False, 0.0):
+            doc[1][2] = value
+            assert renderer.render(doc) == xml(doc)
+            doc[1][1]["x"] = value
+            assert renderer.render(doc) == xml(doc)
+        assert renderer.reused == 1
+
+    def test_first_child_in_attributes_position(self):
+        doc = [
+            "div",
+            ["p", lambda: {"a": 1}, "t"],
+            ["p", None, {"b": 2}, "x"],
+            ["p.c", {}, {"d": 3}],
+        ]
+        renderer = Renderer()
+        assert renderer.render(doc) == xml(doc)
+        assert renderer.render(doc) == xml(doc)
+
+    def test_active_head_of_sequence(self):
+        # the sequence turns into an element when its head renders to a tag
+        doc = ["div", [lambda: "p", "x"], [None, lambda: "b"], [["br"], "y"]]
+        renderer = Renderer()
+        assert renderer.render(doc) == xml(doc) == "<div><p>x</p><b/><br/>y</div>"
+        assert renderer.render(doc) == xml(doc)
+
+    def test_deeply_nested(self):
+        depth = 5000
+        doc = leaf = ["leaf", "x"]
+        for i in range(depth):
+            doc = ["div", {"id": i}, ["p", i], doc]
+        renderer = Renderer()
+        assert renderer.render(doc) == xml(doc)
+        leaf[1] = "y"
+        assert renderer.render(doc) == xml(doc)
+        # the unchanged p elements are reused
+        assert renderer.reused >= depth
+
+    def test_multiple_nodes(self):
+        renderer = Renderer()
+        assert renderer.render(["a"], "text", ["b", 1]) == xml(["a"], "text", ["b", 1])
+        assert renderer.render("<text>") == xml("<text>")
+
+    def test_clear(self):
+        doc = page()
+        renderer = Renderer()
+        renderer.render(doc)
+        renderer.clear()
+        renderer.render(doc)
+        assert renderer.reused == 0
@@ -1,9 +1,21 @@
 from __future__ import annotations
 
+import io
+
+import pytest
+from mu import dump
 from mu import html
+from mu import iter_html
+from mu import iter_sgml
+from mu import iter_xhtml
+from mu import iter_xml
+from mu import Node
+from mu import QNameCache
+from mu import serializers
 from mu import sgml
 from mu import xhtml
 from mu import xml
+from mu import XmlSerializer
 
 
 class TestSerializeXml:
@@ -26,7 +38,10 @@ class TestAttributeFormatting:
 
 class TestElementTextFormatting:
     def test_escaping(self):
-        pass
+        # quotes don't need escaping in text
+        assert xml(["_", '"hi" & <b>']) == '<_>"hi" &amp; &lt;b&gt;</_>'
+        assert xml(["_", 10, 1.5, True]) == "<_>101.5True</_>"
+        assert xml(["$text", "it's <b>"]) == "it's &lt;b&gt;"
 
 
 class TestCreateNode:
@@ -239,3 +254,277 @@ class TestRenderModes:
             sgml(["input", {"type": "checkbox", "checked": False}])
             == '<input type="checkbox">'
         )
+
+
+class TestIterWrite:
+    DOC = [
+        "html",
+        ["head", ["title", "Q&A"], ["link", {"rel": "stylesheet"}]],
+        [
+            "body",
+            ["div#main.card", {"class": "wide"}, "a", ["br"], "b"],
+            ["input", {"type": "checkbox", "checked": True}],
+            ["$comment", "note"],
+            [["p", "x"], ["p", "y"]],
+        ],
+    ]
+
+    def test_fragments_in_document_order(self):
+        assert list(iter_xml(["p", "Hello, ", ["b", "World"], "!"])) == [
+            "<p>",
+            "Hello, ",
+            "<b>",
+            "World",
+            "</b>",
+            "!",
+            "</p>",
+        ]
+
+    def test_same_output_as_string(self):
+        assert "".join(iter_xml(self.DOC)) == xml(self.DOC)
+        assert "".join(iter_html(self.DOC)) == html(self.DOC)
+        assert "".join(iter_xhtml(self.DOC)) == xhtml(self.DOC)
+        assert "".join(iter_sgml(self.DOC)) == sgml(self.DOC)
+        assert "".join(iter_xml(["a"], ["b"], ["c"])) == xml(["a"], ["b"], ["c"])
+
+    def test_is_lazy(self):
+        chunks = iter_xml(["foo", ["bar"]])
+        assert next(chunks) == "<foo>"
+
+
+class TestDump:
+    DOC = ["feed", [["entry", {"id": i}, "caf\u00e9 & co"] for i in range(100)]]
+
+    def test_dump_text(self):
+        fp = io.StringIO()
+        dump(self.DOC, fp)
+        assert fp.getvalue() == xml(self.DOC)
+
+    def test_dump_binary(self):
+        fp = io.BytesIO()
+        dump(self.DOC, fp, method="html", encoding="latin-1")
+        assert fp.getvalue() == html(self.DOC).encode("latin-1")
+
+    def test_dump_buffered(self):
+        class Writer:
+            mode = "w"
+
+            def __init__(self):
+                self.writes = []
+
+            def write(self, data):
+                self.writes.append(data)
+
+        fp = Writer()
+        dump(self.DOC, fp, buffer_size=256)
+        assert "".join(fp.writes) == xml(self.DOC)
+        assert 1 < len(fp.writes) < 100
+        assert all(len(data) >= 256 for data in fp.writes[:-1])
+
+
+class TestQNameCache:
+    def test_valid_names(self):
+        names = QNameCache()
+        assert names.is_qname("foo") is True
+        assert names.is_qname("svg:rect") is True
+        assert names.is_qname("caf\u00e9") is True
+        assert names.is_qname("x:\u00e9l\u00e9ment") is True
+        assert names.is_qname("1foo") is False
+        assert names.is_qname("a b") is False
+        assert names.is_qname(":foo") is False
+
+    def test_counters(self):
+        names = QNameCache()
+        ser = XmlSerializer(qnames=names)
+        ser.write(["a", {"x": 1, "y": 2}, ["b", {"x": 3}], ["b"]])
+        info = names.cache_info()
+        assert info.misses == 4
+        assert info.hits == 2
+        assert info.currsize == 4
+
+    def test_resize(self):
+        names = QNameCache(maxsize=2)
+        for name in ["a", "b", "c"]:
+            names.is_qname(name)
+        assert names.cache_info().currsize == 2
+        names.resize(10)
+        assert names.cache_info().maxsize == 10
+        assert names.cache_info().currsize == 0
+
+    def test_invalid_name_raises(self):
+        with pytest.raises(ValueError):
+            XmlSerializer(qnames=QNameCache()).write(["1foo"])
+
+
+class TestSerializeDeep:
+    def test_deeply_nested(self):
+        depth = 20_000
+        doc = ["leaf", "x"]
+        for _ in range(depth):
+            doc = ["div", [["a"], "b"], doc]
+        assert xml(doc) == "<div><a/>b" * depth + "<leaf>x</leaf>" + "</div>" * depth
+
+
+class UL(Node):
+    def __init__(self, **attrs):
+        super().__init__("ul", **attrs)
+
+    def __call__(self, *nodes, **attrs):
+        nodes = [["li", node] for node in nodes]
+        return super().__call__(*nodes, **attrs)
+
+
+class TestFused:
+    DOCS = [
+        ["div", [UL(cls="foo"), 1, 2, [UL(), 3]], UL(), "x"],
+        ["div", lambda: None],
+        ["div", lambda: ("b", "c"), lambda: ["i", "t"]],
+        ["p", ("b", "c"), None, [None, "i", "t"]],
+        [[UL(), "a"], ["$comment", lambda: "c"]],
+        ["p", lambda: {"id": 1}, "x"],
+        [lambda: "p", "x"],
+        ["p.a", lambda: {"id": 1}, "x"],
+        ["span.a", {}, {"b": 2}],
+        ["p", None, {"b": 2}, lambda: "x"],
+        ["ul", ["li", "a", lambda: None], ["li", lambda: None], ["li", UL(), "b"]],
+    ]
+
+    def test_same_output(self):
+        for name, serializer in serializers.items():
+            fused = type(serializer)(fused=True)
+            for doc in self.DOCS:
+                assert fused.write(doc) == serializer.write(doc), (name, doc)
+            assert fused.write(*self.DOCS) == serializer.write(*self.DOCS)
+
+    def test_select_on_serializer(self):
+        serializer = serializers["html"]
+        try:
+            serializer.fused = True
+            assert html(["div", UL(), ["br"]]) == "<div><ul></ul><br></div>"
+        finally:
+            serializer.fused = False
+
+
+class TestEncoding:
+    DOC = ["p", {"title": "café"}, "€ 10 & café"]
+
+    def test_bytes_output(self):
+        assert xml(self.DOC, encoding="utf-8") == xml(self.DOC).encode("utf-8")
+        assert html(["br"], encoding="utf-8") == b"<br>"
+        assert xhtml(["br"], encoding="utf-8") == b"<br />"
+        assert sgml(["p"], encoding="utf-8") == b"<p>"
+
+    def test_ascii_character_references(self):
+        assert (
+            xml(self.DOC, encoding="ascii")
+            == b'<p title="caf&#233;">&#8364; 10 &amp; caf&#233;</p>'
+        )
+
+    @pytest.mark.parametrize(
+        "doc",
+        [
+            ["$cdata", "é"],
+            ["$comment", "é"],
+            ["$pi", "é"],
+            ["café"],
+            ["p", {"tïtle": "a"}],
+            ["div", ["café", "x"]],
+        ],
+    )
+    def test_unencodable_markup(self, doc):
+        # character references aren't recognized in these places
+        with pytest.raises(UnicodeEncodeError):
+            xml(doc, encoding="ascii")
+        with pytest.raises(UnicodeEncodeError):
+            dump(doc, io.BytesIO(), encoding="ascii")
+        assert xml(doc, encoding="utf-8") == xml(doc).encode("utf-8")
+
+    def test_encoding_follows_settings(self):
+        serializer = XmlSerializer()
+        doc = ["ul", ["li", "café"]]
+        assert serializer.write_bytes(doc, encoding="latin-1") == xml(
+            doc, encoding="latin-1"
+        )
+        serializer.indent = 2
+        assert serializer.write_bytes(doc, encoding="latin-1") == (
+            serializer.write(doc).encode("latin-1")
+        )
+
+    def test_large_output(self):
+        doc = ["feed", [["entry", "é" * 100] for _ in range(2000)]]
+        assert xml(doc, encoding="utf-8") == xml(doc).encode("utf-8")
+
+    def test_write_into_bytearray(self):
+        buffer = bytearray(b"HTTP body: ")
+        written = serializers["xml"].write_into(buffer, self.DOC)
+        assert buffer == b"HTTP body: " + xml(self.DOC).encode("utf-8")
+        assert written == len(xml(self.DOC).encode("utf-8"))
+
+    def test_write_into_memoryview(self):
+        buffer = bytearray(100)
+        written = serializers["html"].write_into(
+            memoryview(buffer), ["br"], ["link"], offset=2
+        )
+        assert written == 10
+        assert buffer[:13] == b"\0\0<br><link>\0"
+        with pytest.raises(ValueError):
+            serializers["html"].write_into(memoryview(bytearray(3)), ["br"])
+
+
+class TestIndent:
+    def test_element_content(self):
+        doc = [
+            "feed",
+            ["title", "T"],
+            ["$comment", "c"],
+            [["entry", i] for i in (1, 2)],
+        ]
+        assert xml(doc, indent=2) == (
+            "<feed>\n"
+            "  <title>T</title>\n"
+            "  <!-- c -->\n"
+            "  <entry>1</entry>\n"
+            "  <entry>2</entry>\n"
+            "</feed>"
+        )
+        assert (
+            xml(["a", ["b", ["c"]]], indent="\t")
+            == "<a>\n\t<b>\n\t\t<c/>\n\t</b>\n</a>"
+        )
+        assert xml(["a"], ["b"], indent=0) == "<a/>\n<b/>"
+
+    def test_mixed_content_is_left_alone(self):
+        doc = ["div", ["p", "Hello ", ["b", "world"], "!"], ["p", ["$raw", "<hr>"]]]
+        assert xml(doc, indent=2) == (
+            "<div>\n  <p>Hello <b>world</b>!</p>\n  <p><hr></p>\n</div>"
+        )
+        doc = ["div", ["p"], ["$cdata", "x"]]
+        assert xml(doc, indent=2) == xml(doc)
+        assert xml(["p"], "text", indent=2) == "<p/>text"
+
+    def test_preserve_space(self):
+        doc = ["div", ["pre", ["code", "x"]], ["g", {"xml:space": "preserve"}, ["a"]]]
+        assert html(doc, indent=1) == (
+            '<div>\n <pre><code>x</code></pre>\n <g xml:space="preserve"><a></a></g>\n'
+            "</div>"
+        )
+        assert xml(doc, indent=1).startswith("<div>\n <pre>\n  <code>")
+
+    def test_streaming(self):
+        doc = ["feed", [["entry", {"id": i}, ["title", "x"]] for i in range(50)]]
+        assert "".join(iter_xml(doc, indent=2)) == xml(doc, indent=2)
+        assert "".join(iter_html(doc, indent=2)) == html(doc, indent=2)
+        fp = io.StringIO()
+        dump(doc, fp, indent=2)
+        assert fp.getvalue() == xml(doc, indent=2)
+        assert xml(doc, indent=2, encoding="utf-8") == xml(doc, indent=2).encode()
+
+    def test_serializer_option(self):
+        doc = ["a", [UL(), "x"]]
+        assert (
+            XmlSerializer(indent=2).write(doc)
+            == "<a>\n  <ul>\n    <li>x</li>\n  </ul>\n</a>"
+        )
+        assert XmlSerializer(indent=2, fused=True).write(doc) == xml(doc, indent=2)
+        # the shared serializers are not changed
+        assert xml(doc) == "<a><ul><li>x</li></ul></a>"
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+from mu.util import escape_attr
 from mu.util import escape_html
+from mu.util import escape_text
 from mu.util import raw_string
 
 RAW = "!@#^$%&*()><?/`~"
@@ -12,6 +14,31 @@ class TestEscapeHTML:
         assert escape_html(RAW) == RAW_ESCAPED
 
 
+class TestEscapeText:
+    def test_escape_text(self):
+        assert escape_text(RAW) == RAW_ESCAPED
+        assert escape_text('"hi" it\'s') == '"hi" it\'s'
+        assert escape_text("plain") == "plain"
+
+    def test_escape_atomic_values(self):
+        assert escape_text(10) == "10"
+        assert escape_text(1.5) == "1.5"
+        assert escape_text(True) == "True"
+        assert escape_text(1j) == "1j"
+        assert escape_text(["<a>"]) == "['&lt;a&gt;']"
+
+
+class TestEscapeAttr:
+    def test_escape_attr(self):
+        assert escape_attr(RAW) == RAW_ESCAPED
+        assert escape_attr('"hi" it\'s') == "&quot;hi&quot; it&#x27;s"
+        assert escape_attr(10) == "10"
+
+    def test_same_as_escape_html(self):
+        for value in [RAW, "a\"b'c", 10, 2.5, False, None, ("x", "<y>")]:
+            assert escape_attr(value) == escape_html(value)
+
+
 class TestRawString:
     def test_raw_strings(self):
         assert raw_string(RAW) == ["$raw", RAW]